@@ -0,0 +1,48 @@
+"""
+Shared helpers for the offline benchmarks.
+
+src modules read their configuration at import time, so benchmark modules import from
+src lazily (inside functions), after offline_env() has set the provider variables.
+"""
+import os
+import statistics
+import sys
+from typing import Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Benign products (no rule pre-screen hit), so every run exercises the full graph
+SAMPLE_PRODUCTS = [
+    {"product_name": "Vitamin C Serum", "category": "Beauty", "material": "Ascorbic acid, hyaluronic acid", "function": "Brightening", "claims": "Reduces dark spots"},
+    {"product_name": "Bamboo Toothbrush", "category": "Personal Care", "material": "Bamboo, nylon bristles", "function": "Oral hygiene", "claims": "Eco-friendly"},
+    {"product_name": "Kids Wooden Puzzle", "category": "Toys", "material": "Birch plywood, water-based paint", "function": "Learning toy", "claims": "Safe for toddlers"},
+    {"product_name": "Whey Protein Powder", "category": "Supplements", "material": "Whey isolate", "function": "Muscle recovery", "claims": "Boosts immunity"},
+    {"product_name": "LED Desk Lamp", "category": "Electronics", "material": "Aluminum, LED", "function": "Lighting", "claims": "Reduces eye strain"},
+]
+
+
+def offline_env(llm_latency_ms: float = 0, llm_ms_per_token: float = 0, completion_tokens: int = 0, embedding_latency_ms: float = 0):
+    """Points get_llm/get_embeddings at the fake providers. Caches, run export and checkpoints are off unless set explicitly."""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["EMBEDDING_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(llm_latency_ms)
+    os.environ["FAKE_LLM_MS_PER_TOKEN"] = str(llm_ms_per_token)
+    os.environ["FAKE_LLM_COMPLETION_TOKENS"] = str(completion_tokens)
+    os.environ["FAKE_EMBEDDING_LATENCY_MS"] = str(embedding_latency_ms)
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    os.environ.setdefault("RUN_METRICS_ENABLED", "false")
+    os.environ.setdefault("CHECKPOINT_ENABLED", "false")  # Keeps checkpoint disk I/O out of the timings
+    os.environ.setdefault("INCREMENTAL_REUSE_ENABLED", "false")  # Repeated products would skip every node
+
+
+def latency_stats(values: List[float]) -> Dict[str, float]:
+    """mean/p50/p95/max in seconds."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "mean_s": round(statistics.mean(ordered), 5),
+        "p50_s": round(statistics.median(ordered), 5),
+        "p95_s": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 5),
+        "max_s": round(ordered[-1], 5),
+    }
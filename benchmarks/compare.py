@@ -0,0 +1,87 @@
+"""
+Regression check between two benchmark result files written by benchmarks.run.
+
+Latency metrics (names ending in _s) regress when they grow by more than the tolerance;
+throughput metrics (per_s, per_min, speedup) regress when they drop by more than it.
+Latencies below --min-seconds in both files are treated as noise.
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --tolerance 0.2
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+HIGHER_IS_BETTER = ("per_s", "per_min", "speedup")
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def direction(metric: str) -> int:
+    """+1 when higher is better, -1 when lower is better, 0 for non-performance fields (counts, sizes)."""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith("_s"):
+        return -1
+    return 0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.2, min_seconds: float = 0.001) -> List[Dict[str, Any]]:
+    """One row per metric present in both result sets: {metric, baseline, current, change_pct, status}."""
+    base, cur = flatten(baseline.get("results", baseline)), flatten(current.get("results", current))
+    rows = []
+    for metric in sorted(set(base) & set(cur)):
+        sign = direction(metric)
+        if sign == 0:
+            continue
+        before, after = base[metric], cur[metric]
+        change = (after - before) / before if before else 0.0
+        status = "ok"
+        if sign < 0 and max(before, after) < min_seconds:
+            status = "noise"
+        elif sign * change < -tolerance:
+            status = "regression"
+        elif sign * change > tolerance:
+            status = "improved"
+        rows.append({"metric": metric, "baseline": before, "current": after, "change_pct": round(change * 100, 1), "status": status})
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]]):
+    for row in rows:
+        if row["status"] in ("regression", "improved"):
+            print(f"{row['status'].upper():<11} {row['metric']}: {row['baseline']:g} -> {row['current']:g} ({row['change_pct']:+.1f}%)")
+    regressions = sum(1 for row in rows if row["status"] == "regression")
+    print(f"{len(rows)} metrics compared, {regressions} regression(s).")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flag benchmark regressions against a saved baseline.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change (0.2 = 20%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.001, help="Ignore latencies below this in both files")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.tolerance, args.min_seconds)
+    print_report(rows)
+    sys.exit(1 if any(row["status"] == "regression" for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: policy indexing time vs corpus size, and retrieval latency vs k.
+
+Indexing runs on synthetic markdown corpora in a temp directory (cold build, no-op resync,
+and a one-file edit). Retrieval queries the real data/policies corpus through the
+PolicyRetriever singleton in its configured RETRIEVAL_MODE.
+
+Usage:
+    python -m benchmarks.indexing --sizes 10,50,200 --k 1,5,10,20
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.common import latency_stats, offline_env
+
+QUERIES = [
+    "Supplements prohibited US", "cosmetics labeling requirements US", "claim substantiation US",
+    "children's toys safety certification", "electronics FCC compliance", "CBD products policy",
+]
+
+
+def make_corpus(root: str, n_files: int, paragraphs: int = 12, seed: int = 11):
+    rng = random.Random(seed)
+    vocabulary = [
+        "product", "label", "claim", "seller", "prohibited", "restricted", "approval", "ingredient",
+        "warning", "certificate", "category", "safety", "marketplace", "listing", "evidence", "policy",
+        "FDA", "CPSC", "FCC", "organic", "supplement", "cosmetic", "toy", "battery", "medical", "device",
+    ]
+    for i in range(n_files):
+        lines = [f"# Synthetic Policy {i}", ""]
+        for p in range(paragraphs):
+            lines.append(f"## Section {p}")
+            lines.append(" ".join(rng.choices(vocabulary, k=rng.randint(40, 120))) + ".")
+            lines.append("")
+        with open(os.path.join(root, f"policy_{i:04d}.md"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def run_indexing(sizes: List[int]) -> Dict:
+    from langchain_chroma import Chroma
+    from src.llm_factory import get_embeddings, get_embedding_config
+    from src.tools.indexing import PolicyIndexer
+
+    embeddings = get_embeddings()
+    _, _, model = get_embedding_config()
+    results = {}
+    for n_files in sizes:
+        workdir = tempfile.mkdtemp(prefix="bench_index_")
+        try:
+            corpus, persist = os.path.join(workdir, "policies"), os.path.join(workdir, "chroma")
+            os.makedirs(corpus)
+            make_corpus(corpus, n_files)
+            store = Chroma(persist_directory=persist, embedding_function=embeddings)
+
+            def sync():
+                indexer = PolicyIndexer(store, embedding_model=model, data_dir=corpus, persist_dir=persist)
+                started = time.perf_counter()
+                stats = indexer.sync()
+                return time.perf_counter() - started, stats
+
+            cold_s, cold_stats = sync()
+            warm_s, _ = sync()
+            with open(os.path.join(corpus, "policy_0000.md"), "a", encoding="utf-8") as f:
+                f.write("\n## Amendment\nSellers must keep updated certificates on file.\n")
+            incremental_s, incremental_stats = sync()
+            results[f"files_{n_files}"] = {
+                "files": n_files,
+                "chunks": cold_stats["chunks_added"],
+                "cold_s": round(cold_s, 4),
+                "resync_noop_s": round(warm_s, 4),
+                "incremental_s": round(incremental_s, 4),
+                "incremental_chunks_added": incremental_stats["chunks_added"],
+            }
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def run_retrieval(ks: List[int], repeats: int) -> Dict:
+    from src.tools.retrieval import get_policy_retriever
+
+    policy_retriever = get_policy_retriever()
+    policy_retriever.reinitialize()
+    policy_retriever.search_many(QUERIES[:1], k=1)  # Warm-up
+    results = {}
+    for k in ks:
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            policy_retriever.search_many(QUERIES, k=k)
+            timings.append(time.perf_counter() - started)
+        results[f"k_{k}"] = {"k": k, "queries": len(QUERIES), "mode": policy_retriever.mode(), **latency_stats(timings)}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark policy indexing and retrieval offline.")
+    parser.add_argument("--sizes", default="10,50,200", help="Comma list of synthetic corpus sizes (files)")
+    parser.add_argument("--k", default="1,5,10,20", help="Comma list of retrieval depths")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0)
+    args = parser.parse_args(argv)
+
+    offline_env(embedding_latency_ms=args.embedding_latency_ms)
+    print(json.dumps({
+        "indexing": run_indexing([int(s) for s in args.sizes.split(",")]),
+        "retrieval": run_retrieval([int(k) for k in args.k.split(",")], args.repeats),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: per-node and end-to-end graph latency, and throughput under concurrency.
+
+Runs offline on the fake chat model and embeddings; simulate endpoint latency with
+--llm-latency-ms / --embedding-latency-ms.
+
+Usage:
+    python -m benchmarks.pipeline --runs 20 --concurrency 1,4,16 --llm-latency-ms 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.common import SAMPLE_PRODUCTS, latency_stats, offline_env
+
+
+def run_latency(runs: int) -> Dict:
+    """Sequential graph invocations: end-to-end and per-node wall time from metrics["nodes"]."""
+    from src.orchestrator import app, build_initial_state, configure_agents, run_config
+
+    configure_agents()
+    app.invoke(build_initial_state(SAMPLE_PRODUCTS[0]), run_config())  # Warm-up: index sync, imports
+
+    e2e, nodes = [], defaultdict(list)
+    for i in range(runs):
+        started = time.perf_counter()
+        state = app.invoke(build_initial_state(SAMPLE_PRODUCTS[i % len(SAMPLE_PRODUCTS)]), run_config())
+        e2e.append(time.perf_counter() - started)
+        for node, record in state["metrics"].get("nodes", {}).items():
+            nodes[node].append(record["wall_s"])
+    return {
+        "runs": runs,
+        "e2e": latency_stats(e2e),
+        "nodes": {node: latency_stats(values) for node, values in nodes.items()},
+    }
+
+
+async def _run_concurrent(skus: int, concurrency: int) -> float:
+    from src.orchestrator import app, build_initial_state, run_config
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await app.ainvoke(build_initial_state(SAMPLE_PRODUCTS[i % len(SAMPLE_PRODUCTS)]), run_config())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(skus)))
+    return time.perf_counter() - started
+
+
+def run_throughput(levels: List[int], skus_per_level: int) -> Dict:
+    """Native-async graph executions with a bounded number in flight, as the batch runner does."""
+    from src.orchestrator import configure_agents
+
+    configure_agents()
+    results = {}
+    for concurrency in levels:
+        skus = max(skus_per_level, concurrency * 2)
+        elapsed = asyncio.run(_run_concurrent(skus, concurrency))
+        results[f"c_{concurrency}"] = {
+            "concurrency": concurrency,
+            "skus": skus,
+            "elapsed_s": round(elapsed, 4),
+            "skus_per_s": round(skus / elapsed, 2) if elapsed else None,
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark graph latency and throughput offline.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma list of in-flight limits")
+    parser.add_argument("--skus", type=int, default=32, help="SKUs per concurrency level")
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0)
+    args = parser.parse_args(argv)
+
+    offline_env(llm_latency_ms=args.llm_latency_ms, embedding_latency_ms=args.embedding_latency_ms)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    print(json.dumps({"latency": run_latency(args.runs), "throughput": run_throughput(levels, args.skus)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
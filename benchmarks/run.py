@@ -0,0 +1,97 @@
+"""
+Offline benchmark suite: graph latency per node and end to end, throughput under
+concurrency, indexing time vs corpus size, retrieval latency vs k, and the TermMatcher
+micro-benchmark. Everything runs on the fake chat model and embeddings behind
+get_llm/get_embeddings, so no endpoint or API key is needed.
+
+Usage:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --llm-latency-ms 300 --embedding-latency-ms 50 --output bench.json
+    python -m benchmarks.run --output bench.json --baseline baseline.json   # exit 1 on regression
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from benchmarks.common import offline_env
+
+SUITES = ("pipeline", "indexing", "retrieval", "term_matcher")
+
+
+def run_suites(args) -> dict:
+    from benchmarks import indexing, pipeline, term_matcher
+
+    results = {}
+    if "pipeline" in args.suites:
+        results["latency"] = pipeline.run_latency(args.runs)
+        results["throughput"] = pipeline.run_throughput([int(c) for c in args.concurrency.split(",")], args.skus)
+    if "indexing" in args.suites:
+        results["indexing"] = indexing.run_indexing([int(s) for s in args.sizes.split(",")])
+    if "retrieval" in args.suites:
+        results["retrieval"] = indexing.run_retrieval([int(k) for k in args.k.split(",")], args.repeats)
+    if "term_matcher" in args.suites:
+        report = term_matcher.run(n_terms=5000, n_listings=500, words_per_listing=150)
+        results["term_matcher"] = {key: value for key, value in report.items() if key != "benchmark"}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--output", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--baseline", help="Saved results to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change before flagging (0.2 = 20%%)")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma list of: {', '.join(SUITES)}")
+    parser.add_argument("--runs", type=int, default=20, help="Sequential graph runs for latency")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma list of in-flight limits for throughput")
+    parser.add_argument("--skus", type=int, default=32, help="SKUs per concurrency level")
+    parser.add_argument("--sizes", default="10,50,200", help="Synthetic corpus sizes (files) for indexing")
+    parser.add_argument("--k", default="1,5,10,20", help="Retrieval depths")
+    parser.add_argument("--repeats", type=int, default=20, help="Repeats per retrieval depth")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated time to first token per LLM call")
+    parser.add_argument("--llm-ms-per-token", type=float, default=0, help="Simulated generation time per completion token")
+    parser.add_argument("--completion-tokens", type=int, default=0, help="Reported completion tokens per call (0 = from response)")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0, help="Simulated round trip per embedding request")
+    args = parser.parse_args(argv)
+    args.suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+
+    fakes = {
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_ms_per_token": args.llm_ms_per_token,
+        "completion_tokens": args.completion_tokens,
+        "embedding_latency_ms": args.embedding_latency_ms,
+    }
+    offline_env(**fakes)
+
+    started = time.perf_counter()
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "suites": args.suites,
+            "fakes": fakes,
+        },
+        "results": run_suites(args),
+    }
+    report["meta"]["duration_s"] = round(time.perf_counter() - started, 2)
+
+    if args.baseline:
+        from benchmarks.compare import compare, print_report
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(baseline, report, args.tolerance)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results written to {args.output}")
+
+    if args.baseline:
+        print_report(report["comparison"])
+        if any(row["status"] == "regression" for row in report["comparison"]):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: compiled TermMatcher vs the per-term substring scan EvalAgent used to do.
+
+Usage:
+    python -m benchmarks.term_matcher --terms 20000 --listings 2000
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.tools.term_matcher import TermMatcher
+
+
+def make_corpus(n_terms: int, n_listings: int, words_per_listing: int, seed: int = 7):
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(max(n_terms, 5000))]
+    terms = list({" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(n_terms)})
+    listings = []
+    for _ in range(n_listings):
+        words = rng.choices(vocabulary, k=words_per_listing)
+        for _ in range(3):  # Plant a few real hits per listing
+            words.insert(rng.randrange(len(words)), rng.choice(terms).upper())
+        listings.append(" ".join(words))
+    return terms, listings
+
+
+def naive_scan(terms, listings) -> int:
+    hits = 0
+    for text in listings:
+        lowered = text.lower()
+        hits += sum(1 for term in terms if term in lowered)
+    return hits
+
+
+def matcher_scan(matcher, listings) -> int:
+    return sum(len(matcher.matched_terms(text)) for text in listings)
+
+
+def run(n_terms: int, n_listings: int, words_per_listing: int) -> dict:
+    terms, listings = make_corpus(n_terms, n_listings, words_per_listing)
+
+    started = time.perf_counter()
+    matcher = TermMatcher(terms)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matcher_hits = matcher_scan(matcher, listings)
+    matcher_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    naive_hits = naive_scan(terms, listings)
+    naive_s = time.perf_counter() - started
+
+    return {
+        "benchmark": "term_matcher",
+        "terms": len(terms),
+        "listings": n_listings,
+        "words_per_listing": words_per_listing,
+        "matcher_build_s": round(build_s, 4),
+        "matcher_scan_s": round(matcher_s, 4),
+        "naive_scan_s": round(naive_s, 4),
+        "speedup": round(naive_s / matcher_s, 1) if matcher_s else None,
+        "matcher_hits": matcher_hits,
+        "naive_hits": naive_hits,  # Higher: substring scan also counts partial-word hits
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TermMatcher against per-term substring scans.")
+    parser.add_argument("--terms", type=int, default=20000)
+    parser.add_argument("--listings", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=150, help="Words per synthetic listing")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.terms, args.listings, args.words), indent=2))
+
+
+if __name__ == "__main__":
+    main()
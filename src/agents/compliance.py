@@ -1,28 +1,42 @@
 from langchain_core.prompts import ChatPromptTemplate
 from src.state import AgentState, ComplianceReport
-from src.llm_factory import get_llm
+from src.llm_factory import LazyLLM
+from src.llm_cache import cached_call, acached_call
+from src.tools.evidence_packing import pack_evidence
+from src.config import EVIDENCE_TOKEN_BUDGET, EVIDENCE_MMR_LAMBDA
 import json
 
+# Bump when the prompt changes so cached reports are not reused
+PROMPT_VERSION = "compliance-v1"
+
 class ComplianceAgent:
-    def __init__(self):
-        self.llm = get_llm(temperature=0)
+    llm = LazyLLM(temperature=0)  # Built on first use, not at import
 
-    def run(self, state: AgentState) -> AgentState:
-        print("--- Compliance Agent ---")
-        state["step_progress"] = "Audit"
-        product_info = state["product_info"]
-        evidence = state["evidence"]
-        
-        if not self.llm or not evidence:
-            state["compliance_report"] = {
-                "risk_level": "UNKNOWN", 
-                "confidence_score": 0.0,
-                "issues": [], 
-                "required_qualifications": [], 
-                "prohibited_expressions": []
+    def _skip_result(self, state: AgentState):
+        if not self.llm or not state["evidence"]:
+            return {
+                "compliance_report": {
+                    "risk_level": "UNKNOWN", 
+                    "confidence_score": 0.0,
+                    "issues": [], 
+                    "required_qualifications": [], 
+                    "prohibited_expressions": []
+                },
+                "step_progress": "Audit",
+                "debug_logs": ["Compliance Agent skipped: No LLM or No Evidence."],
+                **({} if self.llm else {"node_error": "LLM unavailable"})
             }
-            state["debug_logs"].append("Compliance Agent skipped: No LLM or No Evidence.")
-            return state
+        return None
+
+    def _prepare(self, state: AgentState):
+        """Returns (chain, prompt inputs, cache-key inputs, evidence packing stats)."""
+        product_info = state["product_info"]
+        # Token-budgeted, MMR-reranked evidence with redundant metadata stripped (IDs preserved)
+        query_text = " ".join([
+            product_info.get("category", ""), product_info.get("function", ""),
+            product_info.get("claims", ""), *state.get("retrieval_queries", [])
+        ])
+        evidence, packing_stats = pack_evidence(state["evidence"], query_text, EVIDENCE_TOKEN_BUDGET, EVIDENCE_MMR_LAMBDA)
 
         # P0: Safe Prohibited Replacement & Strict Evidence Binding
         prompt = ChatPromptTemplate.from_messages([
@@ -48,25 +62,64 @@ class ComplianceAgent:
 
         structured_llm = self.llm.with_structured_output(ComplianceReport)
         chain = prompt | structured_llm
-        
+        inputs = {
+            "product_info": json.dumps(product_info), 
+            "evidence": json.dumps(evidence)
+        }
+        return chain, inputs, {"product_info": product_info, "evidence": evidence}, packing_stats
+
+    def _result(self, report: ComplianceReport, cache_hit: bool, packing_stats: dict) -> dict:
+        log = f"Compliance analysis done. Risk: {report['risk_level']}" + (" (cached)" if cache_hit else "")
+        packing_log = (
+            f"Evidence packed: {packing_stats['evidence_items_packed']}/{packing_stats['evidence_items_in']} items, "
+            f"{packing_stats['evidence_tokens_saved']} tokens saved."
+        )
+        return {
+            "compliance_report": report,
+            "step_progress": "Audit",
+            "metrics": packing_stats,
+            "debug_logs": [packing_log, log]
+        }
+
+    def _error_result(self, e: Exception) -> dict:
+        print(f"Error in Compliance Agent: {e}")
+        report = {
+            "risk_level": "ERROR", 
+            "confidence_score": 0.0,
+            "issues": [{"issue": str(e), "risk_level": "RED", "severity": "Critical", "suggestion": "Check logs", "evidence_id": "N/A"}], 
+            "required_qualifications": [], 
+            "prohibited_expressions": []
+        }
+        return {"compliance_report": report, "step_progress": "Audit", "debug_logs": [f"Compliance Agent Error: {e}"], "node_error": str(e)}
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Compliance Agent ---")
+        skipped = self._skip_result(state)
+        if skipped:
+            return skipped
+
+        chain, inputs, cache_inputs, packing_stats = self._prepare(state)
+        if not cache_inputs["evidence"]:  # Nothing fit EVIDENCE_TOKEN_BUDGET
+            return self._skip_result({**state, "evidence": []})
         try:
-            report = chain.invoke({
-                "product_info": json.dumps(product_info), 
-                "evidence": json.dumps(evidence)
-            })
-            state["compliance_report"] = report
-            state["debug_logs"].append(f"Compliance analysis done. Risk: {report['risk_level']}")
+            report, cache_hit = cached_call("compliance", self.llm, PROMPT_VERSION, cache_inputs, lambda: chain.invoke(inputs))
+            return self._result(report, cache_hit, packing_stats)
         except Exception as e:
-            print(f"Error in Compliance Agent: {e}")
-            state["compliance_report"] = {
-                "risk_level": "ERROR", 
-                "confidence_score": 0.0,
-                "issues": [{"issue": str(e), "risk_level": "RED", "severity": "Critical", "suggestion": "Check logs", "evidence_id": "N/A"}], 
-                "required_qualifications": [], 
-                "prohibited_expressions": []
-            }
-            state["debug_logs"].append(f"Compliance Agent Error: {e}")
-            
-        return state
+            return self._error_result(e)
+
+    async def arun(self, state: AgentState) -> dict:
+        print("--- Compliance Agent (async) ---")
+        skipped = self._skip_result(state)
+        if skipped:
+            return skipped
+
+        chain, inputs, cache_inputs, packing_stats = self._prepare(state)
+        if not cache_inputs["evidence"]:  # Nothing fit EVIDENCE_TOKEN_BUDGET
+            return self._skip_result({**state, "evidence": []})
+        try:
+            report, cache_hit = await acached_call("compliance", self.llm, PROMPT_VERSION, cache_inputs, lambda: chain.ainvoke(inputs))
+            return self._result(report, cache_hit, packing_stats)
+        except Exception as e:
+            return self._error_result(e)
 
 compliance_agent = ComplianceAgent()
@@ -1,23 +1,42 @@
 from langchain_core.prompts import ChatPromptTemplate
 from src.state import AgentState
-from src.llm_factory import get_llm
+from src.llm_factory import LazyLLM
+from src.llm_cache import cached_call, acached_call
+from src.tools.term_matcher import TermMatcher, get_matcher
 import json
-import re
+
+# Bump when the prompt changes so cached soft evals are not reused
+PROMPT_VERSION = "eval-v1"
+
+# Keywords that require verification against the seller's qualifications
+HIGH_RISK_KEYWORDS = [
+    "fda registered", "fda approved", "gmp", "usda organic", 
+    "clinically tested", "clinically proven", "certified", "guaranteed"
+]
+HIGH_RISK_MATCHER = TermMatcher(HIGH_RISK_KEYWORDS)
+
+def listing_fields(listings):
+    """Yields (version, field, text) for every text field of the A/B listings."""
+    for version in ("version_a", "version_b"):
+        listing = listings.get(version) or {}
+        for field in ("title", "description", "video_script"):
+            if listing.get(field):
+                yield version, field, listing[field]
+        for i, bullet in enumerate(listing.get("bullets") or []):
+            yield version, f"bullets[{i}]", bullet
+        for i, qa in enumerate(listing.get("faq") or []):
+            for key, text in (qa or {}).items():
+                if isinstance(text, str):
+                    yield version, f"faq[{i}].{key}", text
 
 class EvalAgent:
-    def __init__(self):
-        self.llm = get_llm(temperature=0)
+    llm = LazyLLM(temperature=0)  # Built on first use, not at import
 
-    def run(self, state: AgentState) -> AgentState:
-        print("--- Eval Agent ---")
-        state["step_progress"] = "Eval"
+    def _rule_checks(self, state: AgentState):
+        """Deterministic metrics: prohibited terms carried into output and unverified claims, plus match positions."""
         listings = state["listings"]
         compliance_report = state["compliance_report"]
         product_info = state["product_info"]
-        
-        if not listings:
-            state["eval_report"] = {"score": 0, "comments": "No listings to evaluate"}
-            return state
 
         # P0: Unify Metrics & Highlight Hallucinations
         metrics = {
@@ -32,68 +51,108 @@ class EvalAgent:
         prohibited = compliance_report.get("prohibited_expressions", [])
         metrics["prohibited_terms_input"] = len(prohibited)
         
-        combined_text = (
-            str(listings.get("version_a", {})) + 
-            str(listings.get("version_b", {}))
-        ).lower()
-        
-        for item in prohibited:
-            # Check original forbidden terms in output
-            if item["original"].lower() in combined_text:
-                metrics["prohibited_terms_output"] += 1
+        # One compiled pass per listing field: whole-word, case-folded, with positions for highlighting
+        prohibited_matcher = get_matcher(item["original"] for item in prohibited)
+        prohibited_found, highlights = set(), []
+        risky_found = set()
+        for version, field, text in listing_fields(listings):
+            for match in prohibited_matcher.find_all(text):
+                prohibited_found.add(match.term)
+                highlights.append({"version": version, "field": field, "type": "prohibited", **match._asdict()})
+            for match in HIGH_RISK_MATCHER.find_all(text):
+                risky_found.add(match.term)
+                highlights.append({"version": version, "field": field, "type": "high_risk", **match._asdict()})
+        metrics["prohibited_terms_output"] = len(prohibited_found)
 
         # 2. Hallucinations (Strict Gating)
-        # Keywords that require verification
-        high_risk_keywords = [
-            "fda registered", "fda approved", "gmp", "usda organic", 
-            "clinically tested", "clinically proven", "certified", "guaranteed"
-        ]
-        
-        hallucinations_found = []
         # Naive verification: check if these keywords exist in user's qualifications input
         # If not in input, but in output -> Hallucination.
-        qualifications_text = " ".join(product_info.get("qualifications", [])).lower()
-        
-        for kw in high_risk_keywords:
-            if kw in combined_text and kw not in qualifications_text:
-                hallucinations_found.append(kw)
+        verified = HIGH_RISK_MATCHER.matched_terms(" ".join(product_info.get("qualifications", [])))
+        hallucinations_found = [kw for kw in HIGH_RISK_KEYWORDS if kw in risky_found and kw not in verified]
         
         metrics["hallucinations_count"] = len(hallucinations_found)
         if len(hallucinations_found) > 0:
             metrics["risk_gating_passed"] = False
 
+        return metrics, hallucinations_found, highlights
+
+    def _soft_eval_chain(self):
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a QA Auditor. Evaluate the generated listings.
+            Focus ONLY on tone, clarity, and sales effectiveness.
+            DO NOT verify facts (that is done by rules).
+            
+            Provide a JSON output with:
+            - overall_score (0-100)
+            - tone_feedback (string)
+            - clarity_feedback (string)
+            """),
+            ("user", """Listings: {listings}""")
+        ])
+        
+        return prompt | self.llm
+
+    def _result(self, metrics: dict, hallucinations_found: list, highlights: list, soft_eval: str, error: str = "") -> dict:
+        update = {
+            "eval_report": {
+                "metrics": metrics,
+                "hallucinations": hallucinations_found, # For UI highlighting
+                "highlights": highlights, # {version, field, type, term, start, end}
+                "soft_eval": soft_eval
+            },
+            "step_progress": "Eval",
+            "debug_logs": ["Evaluation completed (Rules + LLM)."]
+        }
+        if error:
+            update["node_error"] = error  # The rule checks stand, but the soft eval is retried next run
+        return update
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Eval Agent ---")
+        listings = state["listings"]
+        if not listings:
+            return {"eval_report": {"score": 0, "comments": "No listings to evaluate"}, "step_progress": "Eval"}
+
+        metrics, hallucinations_found, highlights = self._rule_checks(state)
+        error = ""
+
         # 3. Soft Feedback (LLM)
         if self.llm:
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", """You are a QA Auditor. Evaluate the generated listings.
-                Focus ONLY on tone, clarity, and sales effectiveness.
-                DO NOT verify facts (that is done by rules).
-                
-                Provide a JSON output with:
-                - overall_score (0-100)
-                - tone_feedback (string)
-                - clarity_feedback (string)
-                """),
-                ("user", """Listings: {listings}""")
-            ])
-            
-            chain = prompt | self.llm
-            
+            chain = self._soft_eval_chain()
             try:
-                result = chain.invoke({"listings": json.dumps(listings)})
-                soft_eval = result.content
+                soft_eval, _ = cached_call(
+                    "eval", self.llm, PROMPT_VERSION, {"listings": listings},
+                    lambda: chain.invoke({"listings": json.dumps(listings)}).content
+                )
             except Exception as e:
-                soft_eval = f"Soft Eval Error: {e}"
+                soft_eval = error = f"Soft Eval Error: {e}"
         else:
-            soft_eval = "LLM unavailable for soft eval."
+            soft_eval = error = "LLM unavailable for soft eval."
 
-        state["eval_report"] = {
-            "metrics": metrics,
-            "hallucinations": hallucinations_found, # For UI highlighting
-            "soft_eval": soft_eval
-        }
-        state["debug_logs"].append("Evaluation completed (Rules + LLM).")
-            
-        return state
+        return self._result(metrics, hallucinations_found, highlights, soft_eval, error)
+
+    async def arun(self, state: AgentState) -> dict:
+        print("--- Eval Agent (async) ---")
+        listings = state["listings"]
+        if not listings:
+            return {"eval_report": {"score": 0, "comments": "No listings to evaluate"}, "step_progress": "Eval"}
+
+        metrics, hallucinations_found, highlights = self._rule_checks(state)
+        error = ""
+
+        if self.llm:
+            chain = self._soft_eval_chain()
+
+            async def soft_eval_content():
+                return (await chain.ainvoke({"listings": json.dumps(listings)})).content
+
+            try:
+                soft_eval, _ = await acached_call("eval", self.llm, PROMPT_VERSION, {"listings": listings}, soft_eval_content)
+            except Exception as e:
+                soft_eval = error = f"Soft Eval Error: {e}"
+        else:
+            soft_eval = error = "LLM unavailable for soft eval."
+
+        return self._result(metrics, hallucinations_found, highlights, soft_eval, error)
 
 eval_agent = EvalAgent()
@@ -1,15 +1,13 @@
 from src.state import AgentState, ProductInfo
 from src.config import OPENAI_API_KEY
-from src.llm_factory import get_llm
+from src.llm_factory import LazyLLM
 import json
 
 class IntakeAgent:
-    def __init__(self):
-        self.llm = get_llm(temperature=0)
+    llm = LazyLLM(temperature=0)  # Built on first use, not at import
 
-    def run(self, state: AgentState) -> AgentState:
+    def run(self, state: AgentState) -> dict:
         print("--- Intake Agent ---")
-        state["step_progress"] = "Intake"
         user_input = state["user_input"]
         
         product_info = ProductInfo(
@@ -23,8 +21,6 @@ class IntakeAgent:
             qualifications=user_input.get("qualifications", [])
         )
         
-        state["product_info"] = product_info
-        
         # Consistency Check (Rule-based)
         cat_lower = product_info["category"].lower()
         name_lower = product_info["product_name"].lower()
@@ -39,14 +35,20 @@ class IntakeAgent:
                     # Loose check for cosmetic formulation
                     pass
         
-        state["intake_warning"] = warning
-        
-        if "debug_logs" not in state:
-            state["debug_logs"] = []
-        state["debug_logs"].append("Intake completed. Product info structured.")
+        logs = ["Intake completed. Product info structured."]
         if warning:
-            state["debug_logs"].append(f"Intake Warning: {warning}")
+            logs.append(f"Intake Warning: {warning}")
             
-        return state
+        return {
+            "product_info": product_info,
+            "intake_warning": warning,
+            "target_countries": user_input.get("target_countries") or [product_info["target_country"]],
+            "step_progress": "Intake",
+            "debug_logs": logs
+        }
+
+    async def arun(self, state: AgentState) -> dict:
+        # No I/O: the sync path is already non-blocking
+        return self.run(state)
 
 intake_agent = IntakeAgent()
@@ -1,23 +1,52 @@
 from langchain_core.prompts import ChatPromptTemplate
+from langgraph.config import get_stream_writer
 from src.state import AgentState, ListingsCollection
-from src.llm_factory import get_llm
+from src.llm_factory import LazyLLM
+from src.llm_cache import cached_call, acached_call
 import json
 
+# Bump when the prompt changes so cached listings are not reused
+PROMPT_VERSION = "listing-v1"
+
+def _stream_writer():
+    """LangGraph custom-stream writer, or a no-op when called outside a graph run."""
+    try:
+        return get_stream_writer()
+    except (RuntimeError, KeyError):
+        return lambda chunk: None
+
 class ListingGeneratorAgent:
-    def __init__(self):
-        self.llm = get_llm(temperature=0.7)
+    llm = LazyLLM(temperature=0.7)  # Built on first use, not at import
 
-    def run(self, state: AgentState) -> AgentState:
-        print("--- Listing Generator Agent ---")
-        state["step_progress"] = "Generate"
+    def _stream_listings(self, chain, inputs: dict) -> ListingsCollection:
+        """
+        Streams the structured output token by token. Each partial ListingsCollection
+        (title, then bullets, then description per version) is pushed to the graph's
+        "custom" stream so the UI can render it before generation finishes.
+        """
+        writer = _stream_writer()
+        listings = {}
+        for partial in chain.stream(inputs):
+            if partial:
+                listings = partial
+                writer({"listings_partial": partial})
+        return listings
+
+    async def _astream_listings(self, chain, inputs: dict) -> ListingsCollection:
+        writer = _stream_writer()
+        listings = {}
+        async for partial in chain.astream(inputs):
+            if partial:
+                listings = partial
+                writer({"listings_partial": partial})
+        return listings
+
+    def _prepare(self, state: AgentState):
+        """Returns (chain, prompt inputs, cache-key inputs, is_red_risk)."""
         product_info = state["product_info"]
         compliance_report = state["compliance_report"]
         market_data = state["market_data"]
         qualifications = product_info.get("qualifications", [])
-        
-        if not self.llm:
-            state["listings"] = {}
-            return state
 
         # P0: Strict Certification Gating (Verified vs Claimed)
         # Split qualifications (Naive for MVP: assume all are claimed unless 'Verified' prefix, 
@@ -69,21 +98,63 @@ class ListingGeneratorAgent:
         structured_llm = self.llm.with_structured_output(ListingsCollection)
         chain = prompt | structured_llm
         
+        cache_inputs = {
+            "product_info": product_info,
+            "qualifications": qualifications,
+            "compliance_report": compliance_report,
+            "market_data": market_data,
+            "strict_constraints": strict_constraints
+        }
+        inputs = {
+            "product_info": json.dumps(product_info),
+            "qualifications": json.dumps(qualifications),
+            "compliance_report": json.dumps(compliance_report),
+            "market_data": json.dumps(market_data),
+            "strict_constraints": strict_constraints
+        }
+        return chain, inputs, cache_inputs, is_red_risk
+
+    def _result(self, listings: ListingsCollection, cache_hit: bool, is_red_risk: bool) -> dict:
+        if cache_hit:
+            _stream_writer()({"listings_partial": listings})
+        return {
+            "listings": listings,
+            "step_progress": "Generate",
+            "debug_logs": [f"Listings generated. Safe Mode: {is_red_risk}" + (" (cached)" if cache_hit else "")]
+        }
+
+    def _error_result(self, e: Exception) -> dict:
+        print(f"Error in Listing Generator: {e}")
+        return {"step_progress": "Generate", "debug_logs": [f"Listing Generator Error: {e}"], "node_error": str(e)}
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Listing Generator Agent ---")
+        if not self.llm:
+            return {"listings": {}, "step_progress": "Generate", "node_error": "LLM unavailable"}
+
+        chain, inputs, cache_inputs, is_red_risk = self._prepare(state)
         try:
-            listings = chain.invoke({
-                "product_info": json.dumps(product_info),
-                "qualifications": json.dumps(qualifications),
-                "compliance_report": json.dumps(compliance_report),
-                "market_data": json.dumps(market_data),
-                "strict_constraints": strict_constraints
-            })
-            
-            state["listings"] = listings
-            state["debug_logs"].append(f"Listings generated. Safe Mode: {is_red_risk}")
+            listings, cache_hit = cached_call(
+                "listing_generator", self.llm, PROMPT_VERSION, cache_inputs,
+                lambda: self._stream_listings(chain, inputs)
+            )
+            return self._result(listings, cache_hit, is_red_risk)
         except Exception as e:
-            print(f"Error in Listing Generator: {e}")
-            state["debug_logs"].append(f"Listing Generator Error: {e}")
-            
-        return state
+            return self._error_result(e)
+
+    async def arun(self, state: AgentState) -> dict:
+        print("--- Listing Generator Agent (async) ---")
+        if not self.llm:
+            return {"listings": {}, "step_progress": "Generate", "node_error": "LLM unavailable"}
+
+        chain, inputs, cache_inputs, is_red_risk = self._prepare(state)
+        try:
+            listings, cache_hit = await acached_call(
+                "listing_generator", self.llm, PROMPT_VERSION, cache_inputs,
+                lambda: self._astream_listings(chain, inputs)
+            )
+            return self._result(listings, cache_hit, is_red_risk)
+        except Exception as e:
+            return self._error_result(e)
 
 listing_generator_agent = ListingGeneratorAgent()
@@ -2,9 +2,8 @@ from src.state import AgentState
 import random
 
 class MarketInsightAgent:
-    def run(self, state: AgentState) -> AgentState:
+    def run(self, state: AgentState) -> dict:
         print("--- Market Insight Agent ---")
-        state["step_progress"] = "Insight"
         # Mock implementation for MVP
         product_info = state["product_info"]
         category = product_info.get("category", "Item")
@@ -17,14 +16,21 @@ class MarketInsightAgent:
             f"{category} deals"
         ]
         
-        state["market_data"] = {
+        market_data = {
             "keywords": keywords,
             "trend": "Rising",
             "competitor_analysis": "Moderate competition",
             "search_volume": random.randint(1000, 50000),
             "source": "Simulated Data (Demo)" # P0: Source Labeling
         }
-        state["debug_logs"].append("Market data fetched (Mock).")
-        return state
+        return {
+            "market_data": market_data,
+            "step_progress": "Insight",
+            "debug_logs": ["Market data fetched (Mock)."]
+        }
+
+    async def arun(self, state: AgentState) -> dict:
+        # No I/O: the sync path is already non-blocking
+        return self.run(state)
 
 market_insight_agent = MarketInsightAgent()
@@ -0,0 +1,175 @@
+from src.state import AgentState
+from src.tools.retrieval import get_policy_retriever
+from src.tools.embedding_cache import embedding_cache_stats
+from src.agents.policy_retrieval import policy_retrieval_agent
+from src.agents.compliance import compliance_agent
+from src.agents.listing_generator import listing_generator_agent
+from src.agents.eval import eval_agent
+import asyncio
+
+RISK_ORDER = {"RED": 0, "ERROR": 1, "YELLOW": 2, "UNKNOWN": 3, "GREEN": 4}
+
+class MarketRetrievalAgent:
+    """
+    Retrieval for every target market at once: each market searches its own policy partition,
+    but identical query texts are embedded once, in a single request for all markets.
+    """
+
+    def _queries(self, state: AgentState) -> dict:
+        product_info = state["product_info"]
+        return {country: policy_retrieval_agent._queries({**product_info, "target_country": country}) for country in state["target_countries"]}
+
+    def _result(self, per_country: dict, raw_evidence: list) -> dict:
+        market_evidence = {}
+        for country, queries in per_country.items():
+            update = policy_retrieval_agent._result(queries, [item for item in raw_evidence if item.get("market") == country])
+            market_evidence[country] = {"retrieval_queries": queries, "evidence": update["evidence"]}
+
+        unique_queries = list(dict.fromkeys(q for queries in per_country.values() for q in queries))
+        return {
+            "market_evidence": market_evidence,
+            "retrieval_queries": unique_queries,
+            "step_progress": "Evidence",
+            "debug_logs": [
+                f"Multi-market retrieval: {len(unique_queries)} unique query texts for {len(per_country)} markets in one batch.",
+                f"Embedding cache: {embedding_cache_stats()}"
+            ]
+        }
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Multi-Market Retrieval Agent ---")
+        policy_retriever = get_policy_retriever()
+        policy_retriever.reinitialize()
+
+        per_country = self._queries(state)
+        print(f"Searching for: {per_country}")
+        return self._result(per_country, policy_retriever.search_partitioned(per_country))
+
+    async def arun(self, state: AgentState) -> dict:
+        print("--- Multi-Market Retrieval Agent (async) ---")
+        policy_retriever = await asyncio.to_thread(get_policy_retriever)
+        await asyncio.to_thread(policy_retriever.reinitialize)
+
+        per_country = self._queries(state)
+        print(f"Searching for: {per_country}")
+        return self._result(per_country, await policy_retriever.asearch_partitioned(per_country))
+
+def market_payloads(state: AgentState) -> list:
+    """One MarketAuditAgent input per target market: the shared intake and market data plus that market's evidence."""
+    payloads = []
+    for country in state["target_countries"]:
+        payloads.append({
+            "market_country": country,
+            "product_info": {**state["product_info"], "target_country": country},
+            "market_evidence": {country: state["market_evidence"][country]},
+            "market_data": state.get("market_data", {}),
+        })
+    return payloads
+
+class MarketAuditAgent:
+    """
+    Compliance audit and listing generation for one market of a multi-market run, followed by
+    the rule-based eval. The LLM soft eval is skipped per market so each extra market costs
+    two model calls.
+    """
+
+    def _sub_state(self, state: dict) -> dict:
+        market = state["market_evidence"][state["market_country"]]
+        return {
+            "product_info": state["product_info"],
+            "evidence": market["evidence"],
+            "retrieval_queries": market["retrieval_queries"],
+            "market_data": state["market_data"],
+        }
+
+    def _result(self, country: str, sub_state: dict, updates: list) -> dict:
+        metrics, hallucinations_found, highlights = eval_agent._rule_checks(sub_state)
+        audit = {
+            "evidence": sub_state["evidence"],
+            "retrieval_queries": sub_state["retrieval_queries"],
+            "compliance_report": sub_state["compliance_report"],
+            "listings": sub_state["listings"],
+            "eval_report": {
+                "metrics": metrics,
+                "hallucinations": hallucinations_found,
+                "highlights": highlights,
+                "soft_eval": "Skipped in multi-market mode."
+            }
+        }
+        result = {
+            "markets": {country: audit},
+            "step_progress": "Generate",
+            # Evidence packing stats per market; the primary market's are copied to the top level by MarketMatrixAgent
+            "metrics": {"markets": {country: updates[0].get("metrics", {})}},
+            "debug_logs": [f"[{country}] {log}" for update in updates for log in update.get("debug_logs", [])]
+        }
+        errors = [update["node_error"] for update in updates if update.get("node_error")]
+        if errors:
+            result["node_error"] = "; ".join(errors)
+        return result
+
+    def run(self, state: AgentState) -> dict:
+        country = state["market_country"]
+        print(f"--- Market Audit Agent ({country}) ---")
+        sub_state = self._sub_state(state)
+        compliance = compliance_agent.run(sub_state)
+        sub_state["compliance_report"] = compliance["compliance_report"]
+        listing = listing_generator_agent.run(sub_state)
+        sub_state["listings"] = listing.get("listings", {})
+        return self._result(country, sub_state, [compliance, listing])
+
+    async def arun(self, state: AgentState) -> dict:
+        country = state["market_country"]
+        print(f"--- Market Audit Agent ({country}, async) ---")
+        sub_state = self._sub_state(state)
+        compliance = await compliance_agent.arun(sub_state)
+        sub_state["compliance_report"] = compliance["compliance_report"]
+        listing = await listing_generator_agent.arun(sub_state)
+        sub_state["listings"] = listing.get("listings", {})
+        return self._result(country, sub_state, [compliance, listing])
+
+class MarketMatrixAgent:
+    """
+    Joins the per-market audits into the comparison matrix. The first target market is the
+    primary one: its audit fills the single-market keys (compliance_report, listings, ...),
+    so exports and the batch report work unchanged.
+    """
+
+    def _row(self, country: str, audit: dict) -> dict:
+        report = audit["compliance_report"]
+        metrics = audit["eval_report"]["metrics"]
+        return {
+            "country": country,
+            "risk_level": report.get("risk_level", "UNKNOWN"),
+            "issues": len(report.get("issues", [])),
+            "required_qualifications": ", ".join(report.get("required_qualifications", [])),
+            "prohibited_terms_output": metrics.get("prohibited_terms_output", 0),
+            "hallucinations": metrics.get("hallucinations_count", 0),
+            "risk_gating_passed": metrics.get("risk_gating_passed", False),
+            "title": audit["listings"].get("version_b", {}).get("title", ""),
+        }
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Market Matrix Agent ---")
+        markets = state["markets"]
+        countries = [country for country in state["target_countries"] if country in markets]
+        matrix = [self._row(country, markets[country]) for country in countries]
+        primary = markets[countries[0]]
+        strictest = min(matrix, key=lambda row: RISK_ORDER.get(row["risk_level"], len(RISK_ORDER)))
+        return {
+            "market_matrix": matrix,
+            "metrics": state.get("metrics", {}).get("markets", {}).get(countries[0], {}),
+            "evidence": primary["evidence"],
+            "compliance_report": primary["compliance_report"],
+            "listings": primary["listings"],
+            "eval_report": primary["eval_report"],
+            "step_progress": "Eval",
+            "debug_logs": [f"Market matrix built for {', '.join(countries)}. Strictest market: {strictest['country']} ({strictest['risk_level']})."]
+        }
+
+    async def arun(self, state: AgentState) -> dict:
+        return self.run(state)
+
+market_retrieval_agent = MarketRetrievalAgent()
+market_audit_agent = MarketAuditAgent()
+market_matrix_agent = MarketMatrixAgent()
@@ -1,34 +1,20 @@
 from src.state import AgentState, EvidenceItem
-from src.tools.retrieval import retrieve_policy, policy_retriever
+from src.tools.retrieval import get_policy_retriever
+from src.tools.embedding_cache import embedding_cache_stats
+import asyncio
 import datetime
 
 class PolicyRetrievalAgent:
-    def run(self, state: AgentState) -> AgentState:
-        print("--- Policy Retrieval Agent ---")
-        state["step_progress"] = "Evidence"
-        product_info = state["product_info"]
-        
-        # Ensure retriever is fresh (Hot-swap support)
-        policy_retriever.reinitialize()
-        
-        # Formulate queries
-        queries = [
-            f"{product_info['category']} prohibited {product_info['target_country']}",
-            f"{product_info['category']} labeling requirements {product_info['target_country']}",
-            f"{product_info['function']} claim substantiation {product_info['target_country']}"
+    def _queries(self, product_info) -> list:
+        # The market is a metadata filter (country front-matter), not query text, so
+        # identical queries for different markets share one embedding
+        return [
+            f"{product_info['category']} prohibited",
+            f"{product_info['category']} labeling requirements",
+            f"{product_info['function']} claim substantiation"
         ]
-        
-        state["retrieval_queries"] = queries
-        
-        raw_evidence = []
-        for q in queries:
-            print(f"Searching for: {q}")
-            results = retrieve_policy(q)
-            # Tag results with the query that found them
-            for r in results:
-                r["query"] = q
-            raw_evidence.extend(results)
-            
+
+    def _result(self, queries: list, raw_evidence: list) -> dict:
         # Deduplicate and Format
         seen = set()
         formatted_evidence = []
@@ -42,15 +28,48 @@ class PolicyRetrievalAgent:
                     id=f"E{counter}",
                     content=content,
                     source=item.get("source", "Policy DB"),
+                    section=item.get("section", ""),
                     url=item.get("url", "#"), 
-                    date=datetime.date.today().strftime("%Y-%m-%d"), 
+                    date=item.get("effective_date") or datetime.date.today().strftime("%Y-%m-%d"),
                     score="High",
                     query=item.get("query", "Unknown")
                 ))
                 counter += 1
                 
-        state["evidence"] = formatted_evidence
-        state["debug_logs"].append(f"Retrieval completed. Found {len(formatted_evidence)} unique evidence items.")
-        return state
+        return {
+            "retrieval_queries": queries,
+            "evidence": formatted_evidence,
+            "step_progress": "Evidence",
+            "debug_logs": [
+                f"Retrieval completed. Found {len(formatted_evidence)} unique evidence items.",
+                f"Embedding cache: {embedding_cache_stats()}"
+            ]
+        }
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Policy Retrieval Agent ---")
+        
+        # Ensure retriever is fresh (Hot-swap support; only rebuilds if the config/corpus fingerprint changed)
+        policy_retriever = get_policy_retriever()
+        policy_retriever.reinitialize()
+        
+        queries = self._queries(state["product_info"])
+        country = state["product_info"]["target_country"]
+        
+        # One batched embedding call + one multi-query lookup in the market's partition; results come back tagged by query
+        print(f"Searching for: {queries} ({country})")
+        raw_evidence = policy_retriever.search_many(queries, country=country)
+        return self._result(queries, raw_evidence)
+
+    async def arun(self, state: AgentState) -> dict:
+        print("--- Policy Retrieval Agent (async) ---")
+        policy_retriever = await asyncio.to_thread(get_policy_retriever)
+        await asyncio.to_thread(policy_retriever.reinitialize)
+        
+        queries = self._queries(state["product_info"])
+        country = state["product_info"]["target_country"]
+        print(f"Searching for: {queries} ({country})")
+        raw_evidence = await policy_retriever.asearch_many(queries, country=country)
+        return self._result(queries, raw_evidence)
 
 policy_retrieval_agent = PolicyRetrievalAgent()
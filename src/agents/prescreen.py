@@ -0,0 +1,68 @@
+import os
+from src.state import AgentState
+from src.config import RULE_PRESCREEN_ENABLED
+from src.tools.rule_pack import get_rule_pack
+
+class PreScreenAgent:
+    """
+    Checks the normalized product against the structured hard-ban rule pack. A hit on a
+    RED rule writes the final compliance report here (each issue cites its rule ID), so the
+    graph can route straight to the safe template instead of retrieval + three LLM calls.
+    """
+
+    def _blocked_result(self, hits: list) -> dict:
+        evidence = []
+        issues = []
+        for i, hit in enumerate(hits, start=1):
+            evidence_id = f"R{i}"
+            evidence.append({
+                "id": evidence_id,
+                "content": f"[{hit['rule_id']}] {hit['section']}: {hit['reason']}",
+                "source": hit["source"],
+                "section": hit["section"],
+                "url": f"file://{os.path.basename(hit['source'])}",
+                "date": "Static",
+                "score": "High",
+                "query": "Rule pre-screen"
+            })
+            issues.append({
+                "issue": f"Hard-ban rule {hit['rule_id']} triggered by '{hit['term']}' in {hit['field']}: {hit['reason']}",
+                "risk_level": hit["risk_level"],
+                "severity": "Critical",
+                "suggestion": "This product cannot be listed. Remove it from the launch plan or consult policy support.",
+                "evidence_id": evidence_id
+            })
+
+        rule_ids = ", ".join(hit["rule_id"] for hit in hits)
+        return {
+            "prescreen": {"blocked": True, "hits": hits},
+            "retrieval_queries": ["Rule pre-screen"],
+            "evidence": evidence,
+            "compliance_report": {
+                "risk_level": "RED",
+                "confidence_score": 1.0,
+                "issues": issues,
+                "required_qualifications": [],
+                "prohibited_expressions": [
+                    {"original": hit["term"], "suggested": "N/A - prohibited product"} for hit in hits
+                ]
+            },
+            "step_progress": "Audit",
+            "debug_logs": [f"Pre-screen: blocked by {rule_ids}; skipping retrieval and LLM stages."]
+        }
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Pre-Screen Agent ---")
+        if not RULE_PRESCREEN_ENABLED:
+            return {"prescreen": {"blocked": False, "hits": []}, "debug_logs": ["Pre-screen disabled."]}
+
+        hits = [hit for hit in get_rule_pack().screen(state["product_info"]) if hit["risk_level"] == "RED"]
+        if hits:
+            return self._blocked_result(hits)
+        return {"prescreen": {"blocked": False, "hits": []}, "debug_logs": ["Pre-screen: no hard-ban rules triggered."]}
+
+    async def arun(self, state: AgentState) -> dict:
+        # Pure in-memory matching: the sync path is already non-blocking
+        return self.run(state)
+
+prescreen_agent = PreScreenAgent()
@@ -0,0 +1,48 @@
+from src.state import AgentState
+from src.agents.eval import eval_agent
+
+class SafeTemplateAgent:
+    """
+    Terminal node for products blocked by the rule pre-screen: emits the same correction
+    template the listing generator's safe mode asks the LLM for, plus the rule-based eval,
+    without any model call.
+    """
+
+    def _template_listing(self, product_info: dict) -> dict:
+        facts = [f"{label}: {product_info[field]}" for field, label in (("category", "Category"), ("material", "Material / Ingredients")) if product_info.get(field)]
+        return {
+            "title": f"[DRAFT - PENDING COMPLIANCE] {product_info.get('product_name', '')}",
+            "bullets": facts,
+            "description": "This listing draft is withheld pending compliance resolution. Please address the Red Level risks identified in the report.",
+            "faq": [],
+            "video_script": None
+        }
+
+    def run(self, state: AgentState) -> dict:
+        print("--- Safe Template Agent ---")
+        hits = state.get("prescreen", {}).get("hits", [])
+        rule_ids = ", ".join(hit["rule_id"] for hit in hits)
+        listing = self._template_listing(state["product_info"])
+        listings = {
+            "version_a": listing,
+            "version_b": dict(listing),
+            "difference_summary": [f"Both versions withheld: hard-ban rule(s) {rule_ids} triggered in pre-screen."]
+        }
+
+        metrics, hallucinations_found, highlights = eval_agent._rule_checks({**state, "listings": listings})
+        return {
+            "listings": listings,
+            "eval_report": {
+                "metrics": metrics,
+                "hallucinations": hallucinations_found,
+                "highlights": highlights,
+                "soft_eval": "Skipped: product blocked by rule pre-screen."
+            },
+            "step_progress": "Eval",
+            "debug_logs": ["Safe template emitted (no LLM calls)."]
+        }
+
+    async def arun(self, state: AgentState) -> dict:
+        return self.run(state)
+
+safe_template_agent = SafeTemplateAgent()
@@ -3,12 +3,23 @@ import sys
 import os
 import json
 import time
+import uuid
+import hashlib
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from src.orchestrator import app as orchestrator_app
-from src.config import OPENAI_API_KEY
+_imports_started = time.perf_counter()
+from src.orchestrator import app as orchestrator_app, build_initial_state, configure_agents, run_config
+from src.config import CHECKPOINT_ENABLED, OPENAI_API_KEY
+from src.llm_cache import response_cache_stats
+from src.run_metrics import export_run_metrics, summarize
+from src.tools.embedding_cache import embedding_cache_stats
+from src.startup import record, start_background_warmup, startup_report
+from src.incremental import changed_fields, invalidated_nodes
+
+if "imports_s" not in startup_report():
+    record("imports", time.perf_counter() - _imports_started)  # First script run in this process only
 
 st.set_page_config(page_title="Seller Launch Copilot", layout="wide", initial_sidebar_state="expanded")
 
@@ -21,6 +32,18 @@ st.markdown("""
 """)
 st.divider()
 
+def render_listing(listing):
+    """Renders one listing version; tolerates partial (still streaming) listings."""
+    if listing.get("title"):
+        st.subheader(listing["title"])
+    if listing.get("bullets"):
+        st.markdown("**Bullets:**")
+        for b in listing["bullets"]:
+            st.markdown(f"- {b}")
+    if listing.get("description"):
+        st.markdown("**Description:**")
+        st.write(listing["description"])
+
 # --- Sidebar: Configuration & Steps ---
 with st.sidebar:
     st.header("⚙️ Configuration")
@@ -40,10 +63,20 @@ with st.sidebar:
     base_url = st.text_input("Base URL", value=default_base_url)
     model_name = st.text_input("Model Name", value=default_model)
     
+    embedding_backend = st.selectbox(
+        "Embedding Backend", ["Remote (Provider API)", "Local (Offline)"],
+        index=1 if os.getenv("EMBEDDING_PROVIDER", "openai").lower() == "local" else 0,
+        help="Local uses hashed n-gram vectors: no network, deterministic."
+    )
+    os.environ["EMBEDDING_PROVIDER"] = "local" if embedding_backend.startswith("Local") else "openai"
+    
     if api_key:
         os.environ["OPENAI_API_KEY"] = api_key
         os.environ["OPENAI_BASE_URL"] = base_url
         os.environ["OPENAI_MODEL_NAME"] = model_name
+
+    # Policy index sync and client construction run in the background; the page renders now
+    start_background_warmup()
     
     st.divider()
     st.header("📋 Workflow Steps")
@@ -61,6 +94,9 @@ with st.sidebar:
             
     st.divider()
     debug_mode = st.toggle("Debug Mode", value=False)
+    stream_listings = st.toggle("Live Listing Preview", value=True, help="Render listings as they are generated.")
+    if startup_report()["status"] == "warming":
+        st.caption("⏳ Policy index warming up in the background...")
 
 # --- Intake: Structured Form ---
 with st.container():
@@ -68,7 +104,7 @@ with st.container():
     with st.form("intake_form"):
         col1, col2 = st.columns(2)
         with col1:
-            target_country = st.selectbox("Target Country/Market", ["US", "UK", "DE", "JP", "FR"])
+            target_countries = st.multiselect("Target Countries/Markets", ["US", "UK", "DE", "JP", "FR"], default=["US"], help="Several markets are audited in one run; the first is the primary market.")
             # Use session state for category to allow programmatic updates
             if "category_val" not in st.session_state:
                 st.session_state.category_val = "Dietary Supplements"
@@ -90,7 +126,8 @@ if submitted:
     st.session_state.intake_submitted = True
     st.session_state.analysis_started = False
     st.session_state.intake_data = {
-        "target_country": target_country,
+        "target_country": target_countries[0] if target_countries else "US",
+        "target_countries": target_countries,
         "category": category,
         "product_name": product_name,
         "material": material,
@@ -130,6 +167,74 @@ if st.session_state.get("intake_submitted") and not st.session_state.get("analys
     else:
         st.session_state.analysis_started = True
 
+def analysis_key(intake: dict) -> str:
+    """Identifies a run by its intake payload and the model/embedding configuration."""
+    config = {name: os.getenv(name, "") for name in (
+        "LLM_PROVIDER", "OPENAI_BASE_URL", "OPENAI_MODEL_NAME", "EMBEDDING_PROVIDER", "OPENAI_EMBEDDING_MODEL"
+    )}
+    config["api_key_hash"] = hashlib.sha256(os.getenv("OPENAI_API_KEY", "").encode()).hexdigest()[:12]
+    return hashlib.sha256(json.dumps([intake, config], sort_keys=True).encode()).hexdigest()
+
+def run_analysis(input_data: dict, run_id: str, resume: bool = False, reuse: bool = True) -> dict:
+    """
+    Streams the graph with live progress and returns the final state. Every step is
+    checkpointed under run_id; resume=True continues a failed run from its last checkpoint.
+    With reuse, nodes whose inputs did not change since an earlier run reuse its output.
+    """
+    # Construct Initial State
+    initial_state = build_initial_state(input_data)
+
+    # Run Workflow
+    status_text = st.empty()
+    progress_bar = st.progress(0)
+    live_preview = st.empty()
+
+    final_state = initial_state
+    step_count = 0
+    markets = len(initial_state["user_input"]["target_countries"])
+    total_steps = 7 if markets == 1 else 6 + markets  # Multi-market: one audit step per country
+
+    # Hot-swap Re-initialization: re-configure agents with new env vars
+    configure_agents()
+
+    # "values" carries the reducer-merged state; "updates" drives progress;
+    # "custom" carries partial listings while the generator is still streaming
+    graph_input = None if resume else initial_state
+    for mode, output in orchestrator_app.stream(graph_input, run_config(run_id, reuse=reuse), stream_mode=["updates", "values", "custom"]):
+        if mode == "values":
+            final_state = output
+            continue
+        if mode == "custom":
+            if stream_listings and "listings_partial" in output:
+                partial = output["listings_partial"]
+                with live_preview.container():
+                    st.subheader("✍️ Generating Listings...")
+                    col_pa, col_pb = st.columns(2)
+                    with col_pa:
+                        st.caption("🅰️ Version A (Conversion)")
+                        render_listing(partial.get("version_a") or {})
+                    with col_pb:
+                        st.caption("🅱️ Version B (Compliance)")
+                        render_listing(partial.get("version_b") or {})
+            continue
+        for node_name, state_update in output.items():
+            step_count += 1
+            progress_bar.progress(min(step_count / total_steps, 1.0))
+            status_text.text(f"Running: {node_name}...")
+
+            # Update Sidebar Step
+            if state_update and "step_progress" in state_update:
+                st.session_state.current_step = state_update["step_progress"]
+
+    live_preview.empty()
+    progress_bar.progress(1.0)
+    status_text.text("Workflow Complete!")
+    st.session_state.current_step = "Export"
+    # Freeze the run duration: the stored state is re-rendered on later reruns
+    final_state = {**final_state, "metrics": {**final_state["metrics"], "end_time": time.time()}}
+    export_run_metrics(final_state, source="app", run_id=run_id)
+    return final_state
+
 # --- Main Workflow ---
 if st.session_state.get("analysis_started"):
     if not api_key:
@@ -138,71 +243,56 @@ if st.session_state.get("analysis_started"):
         # Use data from session state (which might have been corrected)
         input_data = st.session_state.intake_data
         
-        # Construct Initial State
-        initial_state = {
-            "user_input": {
-                "target_country": input_data["target_country"],
-                "category": input_data["category"],
-                "product_name": input_data["product_name"],
-                "material": input_data["material"],
-                "function": input_data["function"],
-                "target_audience": input_data["target_audience"],
-                "claims": input_data["claims"],
-                "qualifications": [q.strip() for q in input_data["qualifications"].split(",")] if input_data["qualifications"] else []
-            },
-            "product_info": {},
-            "evidence": [],
-            "compliance_report": {},
-            "market_data": {},
-            "listings": {},
-            "eval_report": {},
-            "debug_logs": [],
-            "step_progress": "Intake",
-            "metrics": {"start_time": time.time()}
-        }
-        
-        # Run Workflow
-        status_text = st.empty()
-        progress_bar = st.progress(0)
-        
-        final_state = initial_state
-        step_count = 0
-        total_steps = 6
-        
+        run_key = analysis_key(input_data)
+        last_run = st.session_state.get("last_run")
+
         try:
-            # Hot-swap Re-initialization
-            from src.agents.intake import intake_agent
-            from src.agents.compliance import compliance_agent
-            from src.agents.listing_generator import listing_generator_agent
-            from src.agents.eval import eval_agent
-            from src.llm_factory import get_llm
-            
-            # Re-configure agents with new env vars
-            intake_agent.llm = get_llm(temperature=0)
-            compliance_agent.llm = get_llm(temperature=0)
-            listing_generator_agent.llm = get_llm(temperature=0.7)
-            eval_agent.llm = get_llm(temperature=0)
-            
-            for output in orchestrator_app.stream(initial_state):
-                for node_name, state_update in output.items():
-                    step_count += 1
-                    progress_bar.progress(min(step_count / total_steps, 1.0))
-                    status_text.text(f"Running: {node_name}...")
-                    
-                    # Update final state
-                    final_state.update(state_update)
-                    
-                    # Update Sidebar Step
-                    if "step_progress" in state_update:
-                        st.session_state.current_step = state_update["step_progress"]
+            # Memoized: widget interactions on the results page rerun this script, but only a
+            # changed intake/model config or an explicit Re-run executes the graph again
+            failed_run = st.session_state.get("failed_run")
+            if st.session_state.pop("resume_failed", False) and failed_run and failed_run["key"] == run_key:
+                final_state = run_analysis(input_data, failed_run["run_id"], resume=True)
+                st.session_state.last_run = {"key": run_key, "run_id": failed_run["run_id"], "state": final_state}
+                st.session_state.pop("failed_run")
+            elif st.session_state.get("force_rerun") or not last_run or last_run["key"] != run_key:
+                # An explicit Re-run executes every node; a changed intake re-executes only invalidated ones
+                force = st.session_state.pop("force_rerun", False)
+                if last_run and not force:
+                    changed = changed_fields(last_run["state"].get("user_input", {}), build_initial_state(input_data)["user_input"])
+                    if changed:
+                        previous_nodes = last_run["state"].get("metrics", {}).get("nodes", {})
+                        previous_nodes = {node.split(":")[0] for node in previous_nodes}  # "market_audit:US" -> "market_audit"
+                        rerunning = [node for node in invalidated_nodes(changed) if node in previous_nodes]
+                        st.info(f"Changed: {', '.join(sorted(changed))}. Re-running: {', '.join(rerunning) or 'none'}; unchanged steps reuse the previous run.")
+                run_id = uuid.uuid4().hex[:12]
+                st.session_state.failed_run = {"key": run_key, "run_id": run_id}  # Cleared on success
+                final_state = run_analysis(input_data, run_id, reuse=not force)
+                st.session_state.last_run = {"key": run_key, "run_id": run_id, "state": final_state}
+                st.session_state.pop("failed_run")
+            else:
+                final_state = last_run["state"]
+                st.session_state.current_step = "Export"
 
-            progress_bar.progress(1.0)
-            status_text.text("Workflow Complete!")
-            st.session_state.current_step = "Export"
+            if st.button("🔄 Re-run Analysis", help="Runs the full pipeline again with the same inputs (new LLM calls)."):
+                st.session_state.force_rerun = True
+                st.rerun()
             
             # --- Results Display ---
             st.divider()
             
+            # 0. Multi-market comparison (primary market shown in detail below)
+            market_matrix = final_state.get("market_matrix") or []
+            if market_matrix:
+                st.header("🌍 Market Comparison")
+                st.caption(f"Primary market: {market_matrix[0]['country']}. The panels below show the primary market's audit.")
+                st.table(market_matrix)
+                for row in market_matrix:
+                    audit = final_state["markets"][row["country"]]
+                    with st.expander(f"{row['country']}: {row['risk_level']} ({row['issues']} issues)"):
+                        for issue in audit["compliance_report"].get("issues", []):
+                            st.write(f"- [{issue['risk_level']}] {issue['issue']} (Evidence {issue['evidence_id']})")
+                        render_listing(audit["listings"].get("version_b", {}))
+
             # 1. Evidence Panel
             st.header("🔍 Evidence Audit")
             evidence = final_state.get("evidence", [])
@@ -232,7 +322,8 @@ if st.session_state.get("analysis_started"):
                     with st.expander(f"Query: {q}"):
                         query_items = [i for i in evidence if i.get("query") == q]
                         for item in query_items:
-                            st.markdown(f"**[{item['id']}] {item['source']}**")
+                            section = f" › {item['section']}" if item.get("section") else ""
+                            st.markdown(f"**[{item['id']}] {item['source']}{section}**")
                             st.text_area("Content", item['content'], height=100, key=item['id'])
                             st.divider()
 
@@ -247,6 +338,8 @@ if st.session_state.get("analysis_started"):
             m1.markdown(f"### Risk: :{color}[{risk_level}]")
             m2.metric("Issues Found", len(report.get("issues", [])))
             m3.metric("Confidence Score", f"{report.get('confidence_score', 0.0) * 100:.0f}%")
+            if final_state.get("prescreen", {}).get("blocked"):
+                st.warning("Blocked by rule pre-screen: " + ", ".join(hit["rule_id"] for hit in final_state["prescreen"]["hits"]) + ". Retrieval and LLM stages were skipped.")
             
             # Required Qualifications Checklist
             st.subheader("Required Qualifications")
@@ -301,22 +394,12 @@ if st.session_state.get("analysis_started"):
             with tab_a:
                 ver_a = listings.get("version_a", {})
                 if ver_a:
-                    st.subheader(ver_a.get("title", "No Title"))
-                    st.markdown("**Bullets:**")
-                    for b in ver_a.get("bullets", []):
-                        st.markdown(f"- {b}")
-                    st.markdown("**Description:**")
-                    st.write(ver_a.get("description", ""))
+                    render_listing(ver_a)
             
             with tab_b:
                 ver_b = listings.get("version_b", {})
                 if ver_b:
-                    st.subheader(ver_b.get("title", "No Title"))
-                    st.markdown("**Bullets:**")
-                    for b in ver_b.get("bullets", []):
-                        st.markdown(f"- {b}")
-                    st.markdown("**Description:**")
-                    st.write(ver_b.get("description", ""))
+                    render_listing(ver_b)
                     
             # Difference Summary
             with st.sidebar:
@@ -346,6 +429,11 @@ if st.session_state.get("analysis_started"):
                 for req in req_quals:
                     md_output += f"- [ ] {req}\n"
 
+                if market_matrix:
+                    md_output += "\n### Market Comparison\n"
+                    for row in market_matrix:
+                        md_output += f"- **{row['country']}**: {row['risk_level']}, {row['issues']} issues\n"
+
                 md_output += "\n## 2. Listings\n"
                 md_output += "### Version A (Conversion)\n"
                 md_output += f"**Title:** {listings.get('version_a', {}).get('title', '')}\n\n"
@@ -403,10 +491,27 @@ if st.session_state.get("analysis_started"):
             # Debug Logs
             if debug_mode:
                 st.header("🐞 Debug Logs")
-                st.metric("Total Time", f"{time.time() - final_state['metrics']['start_time']:.2f}s")
+                totals = summarize(final_state["metrics"])
+                t1, t2, t3 = st.columns(3)
+                t1.metric("Total Time", f"{totals['elapsed_s']:.2f}s")
+                t2.metric("LLM Tokens", totals["total_tokens"])
+                t3.metric("Est. Cost", f"${totals['cost_usd']:.4f}")
+                st.write("**Per-Node Metrics:**")
+                st.table([{"node": node, **record} for node, record in final_state["metrics"].get("nodes", {}).items()])
+                st.write("**Cache Stats:**")
+                st.json({"response_cache": response_cache_stats(), "embedding_cache": embedding_cache_stats()})
+                st.write(f"**Run ID:** `{st.session_state.last_run['run_id']}` (resume or re-run nodes with `python -m src.runs`)")
+                st.write("**Startup:**")
+                st.json(startup_report())
                 for log in final_state.get("debug_logs", []):
                     st.text(log)
                     
         except Exception as e:
             st.error(f"Workflow Failed: {e}")
             st.exception(e)
+            if CHECKPOINT_ENABLED and st.session_state.get("failed_run"):
+                run_id = st.session_state.failed_run["run_id"]
+                st.caption(f"Run ID: {run_id}. Completed steps are checkpointed.")
+                if st.button("▶️ Resume from Last Checkpoint", help="Continues the run; completed steps are not re-executed."):
+                    st.session_state.resume_failed = True
+                    st.rerun()
@@ -0,0 +1,197 @@
+"""
+Headless bulk catalog mode.
+
+Runs the orchestrator graph over a CSV/JSONL catalog of intake records with a bounded
+number of concurrent graph executions. Results are appended to a JSONL file as each SKU
+completes; that file doubles as the checkpoint, so re-running the same command skips
+SKUs that already finished successfully. "partial" SKUs, where a node failed (e.g. a
+provider error), run again. With graph checkpoints enabled, a failed SKU resumes from
+its last successful node instead of starting over.
+
+Usage:
+    python -m src.batch catalog.csv --output results.jsonl --concurrency 16
+    python -m src.batch catalog.jsonl --fake-llm   # offline, no API key required
+
+A "target_countries" column (e.g. "US,UK,DE") audits the SKU for every listed market in one run.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import hashlib
+import contextlib
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def load_catalog(path: str) -> List[Dict[str, Any]]:
+    """Reads intake records from .jsonl or .csv. Each record gets a stable 'sku' id."""
+    records = []
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            rows: Iterable[Dict[str, Any]] = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for i, row in enumerate(rows, start=1):
+            row = dict(row)
+            row["sku"] = str(row.get("sku") or row.get("id") or f"row-{i}")
+            records.append(row)
+    return records
+
+
+def load_completed(output_path: str) -> Set[str]:
+    """SKUs already written with status 'ok' (the resume checkpoint)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from an interrupted run
+            if result.get("status") == "ok":
+                done.add(result["sku"])
+    return done
+
+
+class BatchStats:
+    def __init__(self):
+        self.node_latency = defaultdict(list)
+        self.total_tokens = 0
+        self.cost_usd = 0.0
+        self.ok = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        completed = self.ok + self.failed
+        return {
+            "completed": completed,
+            "ok": self.ok,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 2),
+            "skus_per_min": round(completed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            "total_tokens": self.total_tokens,
+            "est_cost_usd": round(self.cost_usd, 4),
+            "node_latency_s": {
+                node: {
+                    "mean": round(statistics.mean(values), 3),
+                    "p50": round(statistics.median(values), 3),
+                    "max": round(max(values), 3),
+                }
+                for node, values in self.node_latency.items()
+            },
+        }
+
+
+async def run_sku(graph, record: Dict[str, Any], semaphore: asyncio.Semaphore, out_file, write_lock: asyncio.Lock, stats: BatchStats):
+    from src.orchestrator import build_initial_state, run_config
+    from src.run_metrics import export_run_metrics, summarize
+
+    async with semaphore:
+        state = build_initial_state(record)
+        node_latency = {}
+        started = time.perf_counter()
+        try:
+            # Stable run ID per (SKU, record content): a retry resumes the failed run's checkpoints
+            config = run_config(sku_run_id(record))
+            saved = await graph.aget_state(config) if graph.checkpointer else None
+            if saved and saved.next:
+                state = await graph.ainvoke(None, config)
+            else:
+                if saved and saved.values:
+                    # A finished "partial" run starts over; its old node records would otherwise merge into the new run
+                    await graph.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+                state = await graph.ainvoke(state, config)
+            # Per-node wall time recorded by the nodes themselves (not event deltas, which
+            # include time spent waiting on the other parallel branch)
+            node_latency = {node: m["wall_s"] for node, m in state.get("metrics", {}).get("nodes", {}).items()}
+            totals = summarize(state.get("metrics", {}))
+            export_run_metrics(state, source="batch", sku=record["sku"])
+            # A node that failed or degraded (provider error, no LLM) leaves the SKU unfinished,
+            # so a resumed batch runs it again
+            node_errors = {node: m["error"] for node, m in state.get("metrics", {}).get("nodes", {}).items() if m.get("error")}
+            result = {
+                "sku": record["sku"],
+                "status": "partial" if node_errors else "ok",
+                "risk_level": state.get("compliance_report", {}).get("risk_level", "UNKNOWN"),
+                "compliance_report": state.get("compliance_report", {}),
+                "listings": state.get("listings", {}),
+                "eval_report": state.get("eval_report", {}),
+            }
+            if state.get("market_matrix"):
+                result["market_matrix"] = state["market_matrix"]
+            if node_errors:
+                result["node_errors"] = node_errors
+                stats.failed += 1
+            else:
+                stats.ok += 1
+            for node_name, latency in node_latency.items():
+                stats.node_latency[node_name].append(latency)
+            stats.total_tokens += totals["total_tokens"]
+            stats.cost_usd += totals["cost_usd"]
+        except Exception as e:
+            result = {"sku": record["sku"], "status": "error", "error": str(e)}
+            stats.failed += 1
+
+        result["node_latency_s"] = node_latency
+        result["elapsed_s"] = round(time.perf_counter() - started, 3)
+
+    async with write_lock:
+        out_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out_file.flush()
+    print(f"[{stats.ok + stats.failed}] {record['sku']}: {result['status']}")
+
+
+def sku_run_id(record: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()[:10]
+    return f"batch-{record['sku']}-{digest}"
+
+
+async def run_catalog(records: List[Dict[str, Any]], output_path: str, concurrency: int) -> Dict[str, Any]:
+    from src.orchestrator import abuild_graph, configure_agents
+
+    configure_agents()
+    done = load_completed(output_path)
+    pending = [r for r in records if r["sku"] not in done]
+    print(f"Catalog: {len(records)} SKUs, {len(done)} already done, {len(pending)} to run (concurrency={concurrency}).")
+
+    stats = BatchStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    async with contextlib.AsyncExitStack() as stack:
+        graph = await stack.enter_async_context(abuild_graph())
+        out_file = stack.enter_context(open(output_path, "a", encoding="utf-8"))
+        await asyncio.gather(*(run_sku(graph, r, semaphore, out_file, write_lock, stats) for r in pending))
+
+    return stats.report()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Seller Launch Copilot over a catalog of SKUs.")
+    parser.add_argument("catalog", help="Path to a .csv or .jsonl file of intake records")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL results file (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max graph executions in flight")
+    parser.add_argument("--fake-llm", action="store_true", help="Use the offline fake LLM (LLM_PROVIDER=fake)")
+    args = parser.parse_args(argv)
+
+    if args.fake_llm:
+        os.environ["LLM_PROVIDER"] = "fake"
+
+    records = load_catalog(args.catalog)
+    report = asyncio.run(run_catalog(records, args.output, args.concurrency))
+
+    print("--- Batch Report ---")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,76 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "policies")
-CHROMA_DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "chroma_db")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data", "policies")
+CHROMA_DB_DIR = os.path.join(PROJECT_ROOT, "data", "chroma_db")
+
+# Vector size of the offline embedding backend (EMBEDDING_PROVIDER=local)
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "1024"))
+
+# Disk-backed embedding cache shared by indexing and query paths
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(PROJECT_ROOT, "data", "embedding_cache.sqlite"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+# Response cache for LLM-backed agents (compliance, listing_generator, eval)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory").lower()  # memory | sqlite
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(PROJECT_ROOT, "data", "llm_cache.sqlite"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_AGENTS = os.getenv("LLM_CACHE_AGENTS", "")  # Comma list; empty = temperature-0 agents only
+
+# Policy retrieval: hybrid (BM25 + vector, rank-fused) | vector | lexical
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+# In hybrid mode, skip the embedding call for queries whose top BM25 score reaches this (0 = never skip)
+HYBRID_LEXICAL_SKIP_SCORE = float(os.getenv("HYBRID_LEXICAL_SKIP_SCORE", "0"))
+# Policy chunking: markdown sections are packed up to this many tokens per chunk (changing it re-indexes)
+CHUNK_TOKEN_TARGET = int(os.getenv("CHUNK_TOKEN_TARGET", "256"))
+
+# Evidence packing before the compliance prompt (tiktoken tokens, MMR relevance/diversity trade-off)
+EVIDENCE_TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "2000"))
+EVIDENCE_MMR_LAMBDA = float(os.getenv("EVIDENCE_MMR_LAMBDA", "0.7"))
+
+# Deterministic pre-screen against data/policies/*.rules.json; hard-ban hits skip retrieval and all later LLM calls
+RULE_PRESCREEN_ENABLED = os.getenv("RULE_PRESCREEN_ENABLED", "true").lower() == "true"
+
+# Per-node run metrics (wall time, tokens, retries, cache hits, cost), appended one JSON line per run
+RUN_METRICS_ENABLED = os.getenv("RUN_METRICS_ENABLED", "true").lower() == "true"
+RUN_METRICS_PATH = os.getenv("RUN_METRICS_PATH", os.path.join(PROJECT_ROOT, "data", "run_metrics.jsonl"))
+
+# Estimated USD per 1M (input, output) tokens; longest model-name prefix wins.
+# Extend or override with MODEL_PRICES_JSON='{"qwen-plus": [0.4, 1.2]}'
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "fake-chat": (0.0, 0.0),
+}
+MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("MODEL_PRICES_JSON") or "{}").items()})
+
+# Graph checkpoints (SQLite), keyed by run ID: failed runs resume from the last successful node
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", os.path.join(PROJECT_ROOT, "data", "checkpoints.sqlite"))
+
+# Incremental re-execution: nodes whose declared inputs (src/incremental.py NODE_READS) are unchanged reuse earlier outputs
+INCREMENTAL_REUSE_ENABLED = os.getenv("INCREMENTAL_REUSE_ENABLED", "true").lower() == "true"
+INCREMENTAL_CACHE_MAX_ENTRIES = int(os.getenv("INCREMENTAL_CACHE_MAX_ENTRIES", "512"))
+
+# Provider call governor (src/llm_factory.py) for every OpenAI-compatible LLM and embedding request:
+# token buckets per (base URL, model), a process-wide in-flight cap, and retries on 429/5xx with
+# jittered exponential backoff that honours Retry-After. Limits of 0 mean unlimited.
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))  # Requests per minute, per (base URL, model)
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))  # Estimated tokens per minute, per (base URL, model)
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))
+LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "30"))
+# Per-model overrides, e.g. RATE_LIMITS_JSON='{"gpt-4o": {"rpm": 500, "tpm": 30000}, "text-embedding-3-small": {"rpm": 3000}}'
+RATE_LIMITS = json.loads(os.getenv("RATE_LIMITS_JSON") or "{}")
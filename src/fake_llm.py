@@ -0,0 +1,149 @@
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from src.tools.local_embeddings import HashingEmbeddings
+
+
+def sample_from_schema(schema: Any, name: str = "value") -> Any:
+    """Builds a deterministic placeholder value matching a TypedDict / typing annotation."""
+    origin = get_origin(schema)
+    if origin is Union:
+        args = [a for a in get_args(schema) if a is not type(None)]
+        return sample_from_schema(args[0], name) if args else None
+    if origin in (list, List):
+        (item_type,) = get_args(schema) or (str,)
+        return [sample_from_schema(item_type, name)]
+    if origin is dict or schema is dict:
+        return {}
+    if schema is str:
+        return f"Fake {name}"
+    if schema is float:
+        return 0.5
+    if schema is int:
+        return 1
+    if schema is bool:
+        return True
+    if isinstance(schema, type) and hasattr(schema, "__annotations__"):
+        return {field: sample_from_schema(hint, field) for field, hint in get_type_hints(schema).items()}
+    return None
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for ChatOpenAI (LLM_PROVIDER=fake).
+    Returns schema-shaped JSON for structured output and a fixed JSON blob otherwise.
+    Latency and reported token counts can be simulated for benchmarks (see get_llm).
+    """
+    model_name: str = "fake-chat"
+    temperature: float = 0
+    structured_schema: Optional[Any] = None
+    stream_chunk_size: int = 8  # Characters per streamed chunk
+    latency_ms: float = 0  # Fixed delay per call (time to first token)
+    ms_per_token: float = 0  # Additional delay per completion token
+    completion_tokens: int = 0  # Reported completion tokens; 0 = derived from the response length
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        if self.structured_schema is not None:
+            return json.dumps(sample_from_schema(self.structured_schema))
+        return json.dumps({"overall_score": 80, "tone_feedback": "Fake feedback", "clarity_feedback": "Fake feedback"})
+
+    def _usage(self, messages: List[BaseMessage], content: str) -> dict:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = self.completion_tokens or len(content) // 4
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _message(self, messages: List[BaseMessage], content: str) -> AIMessage:
+        return AIMessage(
+            content=content,
+            usage_metadata=self._usage(messages, content),
+            response_metadata={"model_name": self.model_name},
+        )
+
+    def _chunks(self, messages: List[BaseMessage], content: str) -> Iterator[Tuple[float, ChatGenerationChunk]]:
+        """(delay before chunk in seconds, chunk) pairs; the per-token delay is spread over the chunks."""
+        pieces = [content[i:i + self.stream_chunk_size] for i in range(0, len(content), self.stream_chunk_size)]
+        usage = self._usage(messages, content)
+        per_chunk = self.ms_per_token * usage["output_tokens"] / max(len(pieces), 1) / 1000
+        for i, piece in enumerate(pieces):
+            delay = per_chunk + (self.latency_ms / 1000 if i == 0 else 0)
+            yield delay, ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        # Like OpenAI's stream_usage: usage and model arrive on a final empty chunk
+        yield 0.0, ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=usage, response_metadata={"model_name": self.model_name}
+        ))
+
+    def _delay(self, messages: List[BaseMessage], content: str) -> float:
+        return (self.latency_ms + self.ms_per_token * self._usage(messages, content)["output_tokens"]) / 1000
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        content = self._respond(messages)
+        if self.latency_ms or self.ms_per_token:
+            time.sleep(self._delay(messages, content))
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, content))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        # Native async so simulated latency does not occupy an executor thread
+        content = self._respond(messages)
+        if self.latency_ms or self.ms_per_token:
+            await asyncio.sleep(self._delay(messages, content))
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, content))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for delay, chunk in self._chunks(messages, self._respond(messages)):
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for delay, chunk in self._chunks(messages, self._respond(messages)):
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False, **kwargs: Any):
+        return self.model_copy(update={"structured_schema": schema}) | JsonOutputParser()
+
+
+class FakeEmbeddings(HashingEmbeddings):
+    """
+    Offline stand-in for OpenAIEmbeddings (EMBEDDING_PROVIDER=fake): deterministic hashing
+    vectors plus a simulated per-request round trip, for benchmarking the dense path.
+    """
+
+    def __init__(self, dim: int = 1024, latency_ms: float = 0):
+        super().__init__(dim=dim)
+        self.latency_ms = latency_ms
+
+    @property
+    def model_name(self) -> str:
+        return f"fake-embeddings-{self.dim}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return super().embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,130 @@
+import copy
+import json
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+from src.config import INCREMENTAL_REUSE_ENABLED, INCREMENTAL_CACHE_MAX_ENTRIES
+from src.llm_cache import canonicalize
+
+PRODUCT_FIELDS = ("target_country", "category", "product_name", "material", "function", "target_audience", "claims", "qualifications")
+ALL_PRODUCT_FIELDS = tuple(f"product_info.{field}" for field in PRODUCT_FIELDS)
+# Intake fields copied to top-level state rather than ProductInfo
+STATE_FIELDS = ("target_countries",)
+
+# State paths each node's output depends on. A node whose paths hold the same values as in
+# an earlier run reuses that run's output instead of executing. Intake is not listed: it
+# only normalizes user_input and always runs.
+NODE_READS = {
+    "prescreen": ("product_info.product_name", "product_info.category", "product_info.material", "product_info.function"),
+    "safe_template": ("product_info.product_name", "product_info.category", "product_info.material", "product_info.qualifications", "prescreen", "compliance_report"),
+    "policy_retrieval": ("product_info.category", "product_info.function", "product_info.target_country"),
+    "market": ("product_info.category",),
+    # The compliance and listing prompts embed the whole ProductInfo
+    "compliance": ALL_PRODUCT_FIELDS + ("evidence", "retrieval_queries"),
+    "listing_generator": ALL_PRODUCT_FIELDS + ("compliance_report", "market_data"),
+    "eval": ("product_info.qualifications", "listings", "compliance_report"),
+    "multi_retrieval": ("product_info.category", "product_info.function", "target_countries"),
+    # Per-market fan-out input: product_info carries that market as target_country
+    "market_audit": ALL_PRODUCT_FIELDS + ("market_country", "market_evidence", "market_data"),
+}
+
+# State keys each node writes, for propagating an invalidation downstream
+NODE_WRITES = {
+    "prescreen": ("prescreen", "evidence", "retrieval_queries", "compliance_report"),
+    "safe_template": ("listings", "eval_report"),
+    "policy_retrieval": ("evidence", "retrieval_queries"),
+    "market": ("market_data",),
+    "compliance": ("compliance_report",),
+    "listing_generator": ("listings",),
+    "eval": ("eval_report",),
+    "multi_retrieval": ("market_evidence", "retrieval_queries"),
+    "market_audit": ("markets",),
+}
+
+# Execution order, so invalidation can be propagated in one pass
+NODE_ORDER = ("prescreen", "safe_template", "policy_retrieval", "multi_retrieval", "market", "compliance", "listing_generator", "eval", "market_audit")
+
+
+def _read_path(state: Dict[str, Any], path: str) -> Any:
+    value: Any = state
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _environment() -> List[str]:
+    """Model and corpus identity: switching either invalidates every reused output."""
+    from src.tools.retrieval import corpus_version
+    names = ("LLM_PROVIDER", "OPENAI_BASE_URL", "OPENAI_MODEL_NAME", "EMBEDDING_PROVIDER", "OPENAI_EMBEDDING_MODEL")
+    return [os.getenv(name, "") for name in names] + [corpus_version()]
+
+
+def reuse_key(node: str, state: Dict[str, Any]) -> Optional[str]:
+    """Hash of the node's declared inputs, or None for nodes that always run."""
+    paths = NODE_READS.get(node)
+    if paths is None:
+        return None
+    inputs = {path: canonicalize(_read_path(state, path)) for path in paths}
+    payload = json.dumps([node, _environment(), inputs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def changed_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> Set[str]:
+    """Intake fields whose canonical value differs between two intake records."""
+    return {field for field in PRODUCT_FIELDS + STATE_FIELDS if canonicalize(previous.get(field)) != canonicalize(current.get(field))}
+
+
+def invalidated_nodes(fields: Iterable[str]) -> List[str]:
+    """Nodes that must re-execute when the given intake fields change (downstream effects included)."""
+    dirty = {field if field in STATE_FIELDS else f"product_info.{field}" for field in fields}
+    invalid = []
+    for node in NODE_ORDER:
+        if dirty & set(NODE_READS[node]):
+            invalid.append(node)
+            dirty.update(NODE_WRITES[node])
+    return invalid
+
+
+class NodeOutputCache:
+    """In-process LRU of node updates keyed by reuse_key()."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            update = self._data.get(key)
+            if update is None:
+                return None
+            self._data.move_to_end(key)
+            self.reused += 1
+            return copy.deepcopy(update)
+
+    def set(self, key: str, update: Dict[str, Any]):
+        with self._lock:
+            self._data[key] = copy.deepcopy(update)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+node_output_cache = NodeOutputCache(INCREMENTAL_CACHE_MAX_ENTRIES)
+
+
+def reuse_enabled(config: Optional[Dict[str, Any]]) -> bool:
+    """On unless disabled globally or for this run (run_config(reuse=False))."""
+    return INCREMENTAL_REUSE_ENABLED and (config or {}).get("configurable", {}).get("reuse_outputs", True)
+
+
+def forced_run(config: Optional[Dict[str, Any]]) -> bool:
+    """An explicit re-run (run_config(reuse=False)): LLM calls bypass the response cache too."""
+    return (config or {}).get("configurable", {}).get("reuse_outputs", True) is False
@@ -0,0 +1,231 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import contextlib
+from collections import OrderedDict, defaultdict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.run_metrics import current_usage
+from src.config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_BACKEND, LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_AGENTS
+)
+
+
+def canonicalize(value: Any) -> Any:
+    """Normalizes inputs so trivially different resubmissions share a cache key."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(k): canonicalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    return value
+
+
+class InMemoryLRUBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteBackend:
+    """Survives restarts and is shared by processes using the same file (e.g. batch workers)."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Cache for LLM-backed agent outputs keyed by a hash of
+    (agent, model, temperature, prompt template version, canonicalized inputs).
+    """
+
+    def __init__(self, backend, ttl_seconds: float, agents: Optional[set] = None, enabled: bool = True):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.agents = agents  # None = cache deterministic (temperature 0) agents only
+        self.enabled = enabled
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def enabled_for(self, agent: str, temperature: float) -> bool:
+        if not self.enabled:
+            return False
+        if self.agents is not None:
+            return agent in self.agents
+        return temperature == 0
+
+    @staticmethod
+    def make_key(agent: str, model: str, temperature: float, prompt_version: str, inputs: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            [agent, model, temperature, prompt_version, canonicalize(inputs)],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, agent: str, key: str) -> Optional[Any]:
+        usage = current_usage()  # Per-node counters of the running graph node, if any
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at >= time.time():
+                self.hits[agent] += 1
+                if usage:
+                    usage.record_cache(True)
+                return value
+            self.backend.delete(key)
+        self.misses[agent] += 1
+        if usage:
+            usage.record_cache(False)
+        return None
+
+    def set(self, key: str, value: Any):
+        self.backend.set(key, value, time.time() + self.ttl_seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for agent in set(self.hits) | set(self.misses):
+            lookups = self.hits[agent] + self.misses[agent]
+            report[agent] = {
+                "hits": self.hits[agent],
+                "misses": self.misses[agent],
+                "hit_rate": round(self.hits[agent] / lookups, 3) if lookups else 0.0,
+            }
+        return report
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            if LLM_CACHE_BACKEND == "sqlite":
+                backend = SQLiteBackend(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES)
+            else:
+                backend = InMemoryLRUBackend(LLM_CACHE_MAX_ENTRIES)
+            agents = {a.strip() for a in LLM_CACHE_AGENTS.split(",") if a.strip()} if LLM_CACHE_AGENTS else None
+            _response_cache = ResponseCache(backend, LLM_CACHE_TTL_SECONDS, agents=agents, enabled=LLM_CACHE_ENABLED)
+        return _response_cache
+
+
+_refresh = ContextVar("llm_cache_refresh", default=False)
+
+
+@contextlib.contextmanager
+def refreshing_responses(enabled: bool = True):
+    """Within the block, cached_call skips cache reads (fresh model calls) but still stores the new results."""
+    token = _refresh.set(enabled)
+    try:
+        yield
+    finally:
+        _refresh.reset(token)
+
+
+def _lookup_key(agent: str, llm, prompt_version: str, inputs: Dict[str, Any]) -> Optional[str]:
+    """Cache key for this call, or None when caching is disabled for the agent."""
+    cache = get_response_cache()
+    temperature = getattr(llm, "temperature", None) or 0
+    if not cache.enabled_for(agent, temperature):
+        return None
+    # Provider and endpoint are part of the identity: a fake or self-hosted model must never
+    # answer from (or into) the entries of the real one, even under the same model name
+    model = "|".join((type(llm).__name__, getattr(llm, "openai_api_base", None) or "", getattr(llm, "model_name", None) or ""))
+    return cache.make_key(agent, model, temperature, prompt_version, inputs)
+
+
+def cached_call(agent: str, llm, prompt_version: str, inputs: Dict[str, Any], compute: Callable[[], Any]) -> Tuple[Any, bool]:
+    """
+    Returns (result, cache_hit). `compute` runs only on a miss; exceptions propagate
+    and are never cached. Results must be JSON-serializable.
+    """
+    key = _lookup_key(agent, llm, prompt_version, inputs)
+    if key is None:
+        return compute(), False
+
+    cache = get_response_cache()
+    cached = None if _refresh.get() else cache.get(agent, key)
+    if cached is not None:
+        return cached, True
+
+    result = compute()
+    cache.set(key, result)
+    return result, False
+
+
+async def acached_call(agent: str, llm, prompt_version: str, inputs: Dict[str, Any], compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+    """Async variant of cached_call; `compute` returns an awaitable."""
+    key = _lookup_key(agent, llm, prompt_version, inputs)
+    if key is None:
+        return await compute(), False
+
+    cache = get_response_cache()
+    cached = None if _refresh.get() else cache.get(agent, key)
+    if cached is not None:
+        return cached, True
+
+    result = await compute()
+    cache.set(key, result)
+    return result, False
+
+
+def response_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Per-agent hit/miss counters of the process-wide response cache."""
+    return get_response_cache().stats()
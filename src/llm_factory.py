@@ -1,47 +1,491 @@
 import os
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from typing import Optional
+import json
+import time
+import random
+import hashlib
+import asyncio
+import threading
+import httpx  # Already loaded with langchain_core
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+from src.config import (
+    EMBEDDING_CACHE_ENABLED, LOCAL_EMBEDDING_DIM, LLM_RPM, LLM_TPM, LLM_MAX_IN_FLIGHT,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE_S, LLM_BACKOFF_MAX_S, RATE_LIMITS,
+)
 
 # Default to OpenAI
 DEFAULT_BASE_URL = "https://api.openai.com/v1"
 DEFAULT_MODEL = "gpt-4o"
 DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
 
+def get_provider() -> str:
+    """'openai' (any OpenAI-compatible endpoint) or 'fake' (offline FakeChatModel)."""
+    return os.getenv("LLM_PROVIDER", "openai").lower()
+
+def get_embedding_provider() -> str:
+    """
+    'openai' (remote endpoint), 'local' (offline HashingEmbeddings, no API key needed)
+    or 'fake' (HashingEmbeddings with a simulated round trip, for benchmarks).
+    """
+    return os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+
+# --- Provider call governor ---
+# Every OpenAI-compatible LLM and embedding request goes through GovernedTransport, which
+# sits under the SDK's HTTP client (the SDK's own retries are disabled).
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+COMPLETION_TOKEN_ESTIMATE = 512  # Counted against TPM when a chat request sets no max_tokens
+
+class TokenBucket:
+    """Per-minute budget refilled continuously. reserve() books capacity and returns how long to wait for it."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Going negative queues the caller behind earlier reservations (first come, first served)
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class InFlightLimiter:
+    """
+    Process-wide cap on concurrent provider requests, shared by threads and event loops.
+    Waiters queue in arrival order and release() hands the freed slot straight to the
+    first one: a thread is woken through its Event, a coroutine by resolving its future
+    on its own loop. Nobody polls, and later arrivals cannot overtake earlier ones.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()  # threading.Event or (loop, future)
+
+    def _take_free_slot(self) -> bool:
+        """Caller holds the lock."""
+        if self._waiters or (self.limit and self.active >= self.limit):
+            return False
+        self.active += 1
+        return True
+
+    def acquire(self):
+        with self._lock:
+            if self._take_free_slot():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()  # Set by release(), which passed its slot on
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take_free_slot():
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        future = waiter[1]
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            if future.done() and not future.cancelled():
+                self.release()  # The slot arrived just before the cancellation
+            raise  # Otherwise _hand_over sees the cancelled future and passes the slot on
+
+    def _hand_over(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    continue  # Its event loop is closed
+            self.active -= 1
+
+def _retry_after_seconds(headers) -> Optional[float]:
+    """Server-requested delay from retry-after-ms or Retry-After (seconds or HTTP date)."""
+    if headers is None:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _record_retry():
+    from src.run_metrics import current_usage
+    usage = current_usage()
+    if usage is not None:
+        usage.record_retry()
+
+class RateGovernor:
+    """
+    Shared limits for provider calls: request and token buckets per (base URL, model), an
+    in-flight cap, and the retry policy (jittered exponential backoff honouring Retry-After).
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_in_flight: int, max_retries: int, backoff_base: float, backoff_max: float, overrides: Dict[str, Dict[str, int]]):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.overrides = overrides
+        self.in_flight = InFlightLimiter(max_in_flight)
+        self._buckets: Dict[Tuple[str, str], Tuple[TokenBucket, TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, request) -> Tuple[Tuple[str, str], int]:
+        """(bucket key, estimated tokens) of an outgoing request, from its URL and JSON body."""
+        try:
+            body = json.loads(request.content or b"{}")
+        except ValueError:
+            body = {}
+        base_url = f"{request.url.scheme}://{request.url.netloc.decode()}"
+        tokens = len(request.content or b"") // 4
+        if not request.url.path.endswith("/embeddings"):
+            tokens += body.get("max_tokens") or body.get("max_completion_tokens") or COMPLETION_TOKEN_ESTIMATE
+        return (base_url, str(body.get("model", ""))), tokens
+
+    def reserve(self, key: Tuple[str, str], tokens: int) -> float:
+        """Books one request and `tokens` tokens in the key's buckets; returns the wait in seconds."""
+        with self._lock:
+            if key not in self._buckets:
+                limits = self.overrides.get(key[1], {})
+                self._buckets[key] = (TokenBucket(limits.get("rpm", self.rpm)), TokenBucket(limits.get("tpm", self.tpm)))
+            requests, token_budget = self._buckets[key]
+        return max(requests.reserve(1), token_budget.reserve(tokens))
+
+    def backoff(self, attempt: int, headers=None) -> float:
+        retry_after = _retry_after_seconds(headers)
+        if retry_after is not None:
+            return retry_after * random.uniform(1.0, 1.2)  # Jitter so throttled callers do not return in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))  # Full jitter
+
+governor = RateGovernor(LLM_RPM, LLM_TPM, LLM_MAX_IN_FLIGHT, LLM_MAX_RETRIES, LLM_BACKOFF_BASE_S, LLM_BACKOFF_MAX_S, RATE_LIMITS)
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees the in-flight slot when closed, so a streamed response holds it until done."""
+
+    def __init__(self, stream: httpx.SyncByteStream, release):
+        self.stream = stream
+        self.release = release
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def close(self):
+        release, self.release = self.release, None
+        try:
+            self.stream.close()
+        finally:
+            if release:
+                release()
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self.stream = stream
+        self.release = release
+
+    def __aiter__(self):
+        return self.stream.__aiter__()
+
+    async def aclose(self):
+        release, self.release = self.release, None
+        try:
+            await self.stream.aclose()
+        finally:
+            if release:
+                release()
+
+class GovernedTransport(httpx.BaseTransport):
+    """
+    httpx transport that runs each request through the governor (sync clients). The in-flight
+    slot is held until the response body is closed, so streamed completions count while streaming.
+    """
+
+    def __init__(self, inner: Optional[httpx.BaseTransport] = None, governor: RateGovernor = governor):
+        self.inner = inner or httpx.HTTPTransport()
+        self.governor = governor
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key, tokens = self.governor.describe(request)
+        for attempt in range(self.governor.max_retries + 1):
+            time.sleep(self.governor.reserve(key, tokens))
+            self.governor.in_flight.acquire()
+            try:
+                response = self.inner.handle_request(request)
+            except httpx.TransportError as e:
+                self.governor.in_flight.release()
+                if attempt == self.governor.max_retries:
+                    raise
+                delay, reason = self.governor.backoff(attempt), type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.governor.max_retries:
+                    self._hold_until_closed(response)
+                    return response
+                delay, reason = self.governor.backoff(attempt, response.headers), response.status_code
+                response.close()
+                self.governor.in_flight.release()
+            _record_retry()
+            print(f"Provider call to {key[1] or key[0]} failed ({reason}); retry {attempt + 1}/{self.governor.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def _hold_until_closed(self, response: httpx.Response):
+        if isinstance(response.stream, httpx.ByteStream):  # Body already in memory
+            self.governor.in_flight.release()
+        else:
+            response.stream = _ReleasingStream(response.stream, self.governor.in_flight.release)
+
+    def close(self):
+        self.inner.close()
+
+class GovernedAsyncTransport(httpx.AsyncBaseTransport):
+    """httpx transport that runs each request through the governor (async clients)."""
+
+    def __init__(self, inner: Optional[httpx.AsyncBaseTransport] = None, governor: RateGovernor = governor):
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.governor = governor
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key, tokens = self.governor.describe(request)
+        for attempt in range(self.governor.max_retries + 1):
+            await asyncio.sleep(self.governor.reserve(key, tokens))
+            await self.governor.in_flight.aacquire()
+            try:
+                response = await self.inner.handle_async_request(request)
+            except httpx.TransportError as e:
+                self.governor.in_flight.release()
+                if attempt == self.governor.max_retries:
+                    raise
+                delay, reason = self.governor.backoff(attempt), type(e).__name__
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.governor.max_retries:
+                    self._hold_until_closed(response)
+                    return response
+                delay, reason = self.governor.backoff(attempt, response.headers), response.status_code
+                await response.aclose()
+                self.governor.in_flight.release()
+            _record_retry()
+            print(f"Provider call to {key[1] or key[0]} failed ({reason}); retry {attempt + 1}/{self.governor.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _hold_until_closed(self, response: httpx.Response):
+        if isinstance(response.stream, httpx.ByteStream):  # Body already in memory
+            self.governor.in_flight.release()
+        else:
+            response.stream = _AsyncReleasingStream(response.stream, self.governor.in_flight.release)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+def governed_http_clients() -> Dict[str, Any]:
+    """SDK client kwargs routing every request through the governor, with the SDK's own retries off."""
+    timeout = httpx.Timeout(600.0, connect=5.0)  # The OpenAI SDK defaults
+    return {
+        "http_client": httpx.Client(transport=GovernedTransport(), timeout=timeout, follow_redirects=True),
+        "http_async_client": httpx.AsyncClient(transport=GovernedAsyncTransport(), timeout=timeout, follow_redirects=True),
+        "max_retries": 0,
+    }
+
+def _key_hash(api_key: Optional[str]) -> Optional[str]:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else None
+
+class ClientRegistry:
+    """
+    Process-wide LLM and embedding clients, keyed by their configuration (provider, base URL,
+    API key hash, ...) plus a variant (model, temperature). Equal keys return the same
+    instance, and every remote client shares one pair of keep-alive httpx pools behind the
+    governor, so connections and TLS sessions are reused across agents, reruns and runs.
+    A configuration change (e.g. a new key or base URL from the sidebar) evicts the clients
+    built for the old one.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, tuple, Any], Any] = {}
+        self._http: Optional[Dict[str, Any]] = None
+        self._lock = threading.RLock()
+
+    def get(self, kind: str, config: tuple, variant: Any, factory):
+        key = (kind, config, variant)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                for stale in [k for k in self._clients if k[0] == kind and k[1] != config]:
+                    del self._clients[stale]
+                client = self._clients[key] = factory()
+            return client
+
+    def http_clients(self) -> Dict[str, Any]:
+        """The shared governed httpx clients, created on first use."""
+        with self._lock:
+            if self._http is None:
+                self._http = governed_http_clients()
+            return self._http
+
+    def clear(self):
+        """Drops every cached client; the next get_llm()/get_embeddings() builds new ones."""
+        with self._lock:
+            self._clients.clear()
+
+client_registry = ClientRegistry()
+
 def get_llm(temperature: float = 0, model_name: Optional[str] = None):
     """
-    Returns a configured ChatOpenAI instance.
-    Uses environment variables for configuration.
+    Returns the shared chat model for the current environment configuration
+    (ChatOpenAI, or FakeChatModel when LLM_PROVIDER=fake). None without an API key.
     """
     api_key = os.getenv("OPENAI_API_KEY")
     base_url = os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL)
     model = model_name or os.getenv("OPENAI_MODEL_NAME", DEFAULT_MODEL)
 
+    if get_provider() == "fake":
+        # Simulated latency / token counts, for offline benchmarks
+        fake = {
+            "latency_ms": float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+            "ms_per_token": float(os.getenv("FAKE_LLM_MS_PER_TOKEN", "0")),
+            "completion_tokens": int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "0")),
+        }
+
+        def build_fake():
+            from src.fake_llm import FakeChatModel
+            # Keeps its own "fake-chat" name: priced at $0 and never mistaken for the real model
+            return FakeChatModel(temperature=temperature, **fake)
+
+        return client_registry.get("llm", ("fake", *fake.values()), (model, temperature), build_fake)
+
     if not api_key:
         return None
 
-    return ChatOpenAI(
-        model=model,
-        temperature=temperature,
-        openai_api_key=api_key,
-        openai_api_base=base_url
-    )
+    def build():
+        from langchain_openai import ChatOpenAI  # Deferred: the OpenAI SDK import is a large part of cold start
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            openai_api_key=api_key,
+            openai_api_base=base_url,
+            # Usage on the final streamed chunk: without it, streamed calls (the listing
+            # generator) report no tokens or cost for non-OpenAI base URLs
+            stream_usage=True,
+            **client_registry.http_clients()
+        )
 
-def get_embeddings():
+    return client_registry.get("llm", ("openai", base_url, _key_hash(api_key)), (model, temperature), build)
+
+def get_embedding_config() -> Tuple[Optional[str], str, str]:
     """
-    Returns a configured OpenAIEmbeddings instance.
+    Returns (api_key, base_url, model) for embeddings from environment variables.
     """
+    if get_embedding_provider() == "local":
+        return None, "local", f"local-hashing-v1-{LOCAL_EMBEDDING_DIM}"
+    if get_embedding_provider() == "fake":
+        return None, "fake", f"fake-embeddings-{LOCAL_EMBEDDING_DIM}"
+
     api_key = os.getenv("OPENAI_API_KEY")
     base_url = os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL)
     # Alibaba Cloud Qwen compatible embeddings usually use text-embedding-v1 or similar
     # But if using standard OpenAI, it's text-embedding-3-small
     # We will allow env var override
     model = os.getenv("OPENAI_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+    return api_key, base_url, model
+
+def get_embeddings():
+    """
+    Returns the shared embeddings client for the current configuration: OpenAIEmbeddings
+    (behind the disk cache), or the offline HashingEmbeddings when EMBEDDING_PROVIDER=local.
+    """
+    if get_embedding_provider() == "local":
+        # Computed locally in microseconds; nothing to gain from the disk cache
+        from src.tools.local_embeddings import HashingEmbeddings
+        return client_registry.get("embeddings", ("local",), LOCAL_EMBEDDING_DIM, lambda: HashingEmbeddings(dim=LOCAL_EMBEDDING_DIM))
+    if get_embedding_provider() == "fake":
+        from src.fake_llm import FakeEmbeddings
+        latency_ms = float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", "0"))
+        return client_registry.get("embeddings", ("fake", latency_ms), LOCAL_EMBEDDING_DIM, lambda: FakeEmbeddings(dim=LOCAL_EMBEDDING_DIM, latency_ms=latency_ms))
+
+    api_key, base_url, model = get_embedding_config()
 
     if not api_key:
         return None
 
-    return OpenAIEmbeddings(
-        model=model,
-        openai_api_key=api_key,
-        openai_api_base=base_url
-    )
+    def build():
+        from langchain_openai import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings(
+            model=model,
+            openai_api_key=api_key,
+            openai_api_base=base_url,
+            **client_registry.http_clients()
+        )
+        if not EMBEDDING_CACHE_ENABLED:
+            return embeddings
+
+        from src.tools.embedding_cache import CachedEmbeddings
+        return CachedEmbeddings(embeddings, model=model)
+
+    return client_registry.get("embeddings", ("openai", base_url, _key_hash(api_key)), model, build)
+
+class LazyLLM:
+    """
+    Agent attribute that builds its LLM client with get_llm() on first access instead of
+    at import. Assigning to it replaces the client (hot-swap); deleting it makes the next
+    access resolve it again from the current environment (the
+    shared client_registry instance when that is unchanged).
+    """
+
+    def __init__(self, temperature: float = 0):
+        self.temperature = temperature
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self.attr = f"_{name}"
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if self.attr not in obj.__dict__:
+            with self._lock:
+                if self.attr not in obj.__dict__:
+                    obj.__dict__[self.attr] = get_llm(temperature=self.temperature)
+        return obj.__dict__[self.attr]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.attr] = value
+
+    def __delete__(self, obj):
+        obj.__dict__.pop(self.attr, None)
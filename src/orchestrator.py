@@ -1,49 +1,304 @@
+import os
+import time
+import asyncio
+import contextlib
+import uuid
+import threading
+from typing import Any, Dict, Optional
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
-from src.state import AgentState
+from langgraph.types import Send
+from src.state import AgentState, merge_dicts
+from src.config import CHECKPOINT_ENABLED, CHECKPOINT_PATH
+from src.run_metrics import track_node, with_node_metrics
+from src.incremental import forced_run, node_output_cache, reuse_enabled, reuse_key
+from src.llm_cache import refreshing_responses
 from src.agents.intake import intake_agent
+from src.agents.prescreen import prescreen_agent
+from src.agents.safe_template import safe_template_agent
 from src.agents.policy_retrieval import policy_retrieval_agent
 from src.agents.compliance import compliance_agent
 from src.agents.market import market_insight_agent
 from src.agents.listing_generator import listing_generator_agent
 from src.agents.eval import eval_agent
+from src.agents.multi_market import market_audit_agent, market_matrix_agent, market_payloads, market_retrieval_agent
 
-def run_intake(state: AgentState):
-    return intake_agent.run(state)
+def configure_agents():
+    """Hot-swap: drop the agent LLM clients; each is rebuilt from the current environment variables on next use."""
+    for agent in (intake_agent, compliance_agent, listing_generator_agent, eval_agent):
+        del agent.llm
 
-def run_policy_retrieval(state: AgentState):
-    return policy_retrieval_agent.run(state)
+def build_initial_state(intake: Dict[str, Any]) -> AgentState:
+    """Builds the graph input from a raw intake record (Streamlit form or catalog row)."""
+    qualifications = intake.get("qualifications") or []
+    if isinstance(qualifications, str):
+        qualifications = [q.strip() for q in qualifications.split(",") if q.strip()]
+    # Several target countries (list or comma string) run the multi-market fan-out
+    countries = intake.get("target_countries") or [intake.get("target_country") or "US"]
+    if isinstance(countries, str):
+        countries = [c.strip() for c in countries.split(",") if c.strip()]
+    countries = list(dict.fromkeys(countries)) or ["US"]
 
-def run_compliance(state: AgentState):
-    return compliance_agent.run(state)
+    return {
+        "user_input": {
+            "target_country": countries[0],
+            "target_countries": countries,
+            "category": intake.get("category", ""),
+            "product_name": intake.get("product_name", ""),
+            "material": intake.get("material", ""),
+            "function": intake.get("function", ""),
+            "target_audience": intake.get("target_audience", ""),
+            "claims": intake.get("claims", ""),
+            "qualifications": qualifications
+        },
+        "product_info": {},
+        "prescreen": {},
+        "evidence": [],
+        "compliance_report": {},
+        "market_data": {},
+        "listings": {},
+        "eval_report": {},
+        "debug_logs": [],
+        "step_progress": "Intake",
+        "metrics": {"start_time": time.time()}
+    }
 
-def run_market(state: AgentState):
-    return market_insight_agent.run(state)
+def _reused(name: str, key: str, config) -> Optional[dict]:
+    """Earlier output of this node for identical inputs, if reuse is on for the run."""
+    if key is None or not reuse_enabled(config):
+        return None
+    update = node_output_cache.get(key)
+    if update is None:
+        return None
+    update["debug_logs"] = [f"{name}: inputs unchanged, reused previous output."]
+    return with_node_metrics(update, name, {"wall_s": 0.0, "reused": True})
 
-def run_listing_generator(state: AgentState):
-    return listing_generator_agent.run(state)
+def _finish(name: str, key: Optional[str], update: dict, record: dict) -> dict:
+    """
+    Stores a successful update for reuse and attaches the node's metrics. Agents flag
+    failed or degraded outputs (provider errors, no LLM) with "node_error"; those are
+    recorded in the metrics and never reused, so the next run retries them.
+    """
+    error = update.pop("node_error", None)
+    if error:
+        record["error"] = error
+    elif key is not None:
+        node_output_cache.set(key, update)
+    return with_node_metrics(update, name, record)
 
-def run_eval(state: AgentState):
-    return eval_agent.run(state)
+def agent_node(name: str, agent) -> RunnableLambda:
+    """
+    Graph node backed by both the agent's sync run (invoke/stream) and its native
+    async arun (ainvoke/astream), so one event loop can keep many analyses in flight.
+    Each call records wall time, tokens, retries, cache hits and cost under metrics["nodes"][name].
+    Nodes whose NODE_READS inputs match an earlier successful execution return that output without running.
+    Per-market fan-out calls are recorded as "name:COUNTRY".
+    """
+    def label(state: AgentState) -> str:
+        return f"{name}:{state['market_country']}" if state.get("market_country") else name
+
+    def run(state: AgentState, config) -> dict:
+        key = reuse_key(name, state)
+        reused = _reused(label(state), key, config)
+        if reused is not None:
+            return reused
+        with track_node() as record, refreshing_responses(forced_run(config)):
+            update = agent.run(state)
+        return _finish(label(state), key, update, record)
+
+    async def arun(state: AgentState, config) -> dict:
+        key = reuse_key(name, state)
+        reused = _reused(label(state), key, config)
+        if reused is not None:
+            return reused
+        with track_node() as record, refreshing_responses(forced_run(config)):
+            update = await agent.arun(state)
+        return _finish(label(state), key, update, record)
+
+    return RunnableLambda(run, afunc=arun, name=type(agent).__name__)
 
 # Define the graph
 workflow = StateGraph(AgentState)
 
 # Add nodes
-workflow.add_node("intake", run_intake)
-workflow.add_node("policy_retrieval", run_policy_retrieval)
-workflow.add_node("compliance", run_compliance)
-workflow.add_node("market", run_market)
-workflow.add_node("listing_generator", run_listing_generator)
-workflow.add_node("eval", run_eval)
+workflow.add_node("intake", agent_node("intake", intake_agent))
+workflow.add_node("prescreen", agent_node("prescreen", prescreen_agent))
+workflow.add_node("safe_template", agent_node("safe_template", safe_template_agent))
+workflow.add_node("policy_retrieval", agent_node("policy_retrieval", policy_retrieval_agent))
+workflow.add_node("compliance", agent_node("compliance", compliance_agent))
+workflow.add_node("market", agent_node("market", market_insight_agent))
+workflow.add_node("listing_generator", agent_node("listing_generator", listing_generator_agent))
+workflow.add_node("eval", agent_node("eval", eval_agent))
+workflow.add_node("multi_retrieval", agent_node("multi_retrieval", market_retrieval_agent))
+workflow.add_node("market_audit", agent_node("market_audit", market_audit_agent))
+workflow.add_node("market_matrix", agent_node("market_matrix", market_matrix_agent))
+
+def market_fanout(state: AgentState) -> dict:
+    """Join point of the shared multi-market stages; send_markets() then fans out per country."""
+    return {"debug_logs": [f"Fanning out to markets: {', '.join(state['target_countries'])}."]}
+
+workflow.add_node("market_fanout", market_fanout)
+
+def route_after_prescreen(state: AgentState):
+    """Hard-ban hits go straight to the template output; everything else fans out as usual."""
+    if state.get("prescreen", {}).get("blocked"):
+        return "safe_template"
+    if len(state.get("target_countries") or []) > 1:
+        return ["multi_retrieval", "market"]
+    return ["policy_retrieval", "market"]
+
+def send_markets(state: AgentState):
+    """One concurrent market_audit branch per target country."""
+    return [Send("market_audit", payload) for payload in market_payloads(state)]
 
 # Define edges
+# The rule pre-screen short-circuits clear-cut RED products. Otherwise market insight
+# only needs product_info, so it runs concurrently with the retrieval -> compliance
+# branch; listing generation joins on both.
+# With several target countries, intake, pre-screen and market insight run once and
+# retrieval runs once for all markets; compliance + listing then fan out per country
+# (market_audit) and market_matrix joins them into the comparison.
 workflow.set_entry_point("intake")
-workflow.add_edge("intake", "policy_retrieval")
+workflow.add_edge("intake", "prescreen")
+workflow.add_conditional_edges("prescreen", route_after_prescreen, ["safe_template", "policy_retrieval", "multi_retrieval", "market"])
+workflow.add_edge("safe_template", END)
 workflow.add_edge("policy_retrieval", "compliance")
-workflow.add_edge("compliance", "market")
-workflow.add_edge("market", "listing_generator")
+workflow.add_edge(["compliance", "market"], "listing_generator")
 workflow.add_edge("listing_generator", "eval")
 workflow.add_edge("eval", END)
+workflow.add_edge(["multi_retrieval", "market"], "market_fanout")
+workflow.add_conditional_edges("market_fanout", send_markets, ["market_audit"])
+workflow.add_edge("market_audit", "market_matrix")
+workflow.add_edge("market_matrix", END)
+
+# Node runnables by name, for re-executing a single node against a saved state
+NODES = {name: spec.runnable for name, spec in workflow.nodes.items()}
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+def _threaded_sqlite_saver(conn):
+    """
+    SqliteSaver whose async methods run the sync ones in a worker thread (the stock saver
+    raises NotImplementedError for them), so one checkpointed graph serves both
+    invoke/stream and ainvoke/astream.
+    """
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class ThreadedSqliteSaver(SqliteSaver):
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    return ThreadedSqliteSaver(conn)
+
+def get_checkpointer():
+    """Process-wide SQLite checkpointer for the sync and async graph APIs, or None when CHECKPOINT_ENABLED=false."""
+    global _checkpointer
+    if not CHECKPOINT_ENABLED:
+        return None
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            import sqlite3
+            os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+            _checkpointer = _threaded_sqlite_saver(sqlite3.connect(CHECKPOINT_PATH, check_same_thread=False))
+        return _checkpointer
+
+def build_graph(checkpointer=None):
+    """Compiles the workflow with the given checkpointer (None: no checkpoints)."""
+    return workflow.compile(checkpointer=checkpointer)
+
+@contextlib.asynccontextmanager
+async def abuild_graph():
+    """
+    Async-only graph for high-concurrency callers (the batch runner): checkpoints go through
+    aiosqlite on the event loop instead of worker threads. Same database as `app`.
+    """
+    if not CHECKPOINT_ENABLED:
+        yield build_graph()
+        return
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(CHECKPOINT_PATH) as checkpointer:
+        yield build_graph(checkpointer)
+
+def run_config(run_id: Optional[str] = None, reuse: bool = True) -> Dict[str, Any]:
+    """
+    Graph config for one run. The run ID is the checkpoint thread, so the run can be resumed
+    later; reuse=False makes every node execute even if its inputs are unchanged, with fresh
+    LLM calls instead of response-cache hits.
+    """
+    return {"configurable": {"thread_id": run_id or uuid.uuid4().hex[:12], "reuse_outputs": reuse}}
+
+def resume_run(run_id: str, graph=None) -> AgentState:
+    """Continues a failed or interrupted run from its last checkpoint; completed nodes are not re-executed."""
+    graph = graph or app
+    config = run_config(run_id)
+    snapshot = graph.get_state(config)
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint found for run {run_id}")
+    if not snapshot.next:
+        return snapshot.values  # Already finished
+    return graph.invoke(None, config)
+
+def _combine_updates(updates: list) -> dict:
+    """Folds several updates of one node into one, applying the state reducers (fan-out re-runs)."""
+    combined: Dict[str, Any] = {}
+    for update in updates:
+        for key, value in update.items():
+            if key in ("markets", "metrics"):
+                combined[key] = merge_dicts(combined.get(key, {}), value)
+            elif key == "debug_logs":
+                combined[key] = combined.get(key, []) + value
+            else:
+                combined[key] = value
+    return combined
+
+def rerun_node(run_id: str, node: str, continue_run: bool = False, graph=None) -> AgentState:
+    """
+    Re-executes one node against the run's latest saved state and records its output as a new
+    checkpoint, as if that node had just run. With continue_run, the run is instead forked from
+    the checkpoint taken right before the node last ran, so the node and everything downstream
+    of it (joins and routing included) execute again. market_audit only runs inside the
+    multi-market fan-out, so it is re-executed once per target market of the saved run.
+    """
+    graph = graph or app
+    if node not in NODES:
+        raise ValueError(f"Unknown node '{node}'. Expected one of: {', '.join(NODES)}")
+    config = run_config(run_id)
+    snapshot = graph.get_state(config)
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint found for run {run_id}")
+
+    force = {"configurable": {"reuse_outputs": False}}  # An explicit re-run executes the node(s)
+    if continue_run:
+        for past in graph.get_state_history(config):  # Newest first
+            if node in past.next:
+                return graph.invoke(None, {**past.config, "configurable": {**past.config["configurable"], **force["configurable"]}})
+        raise ValueError(f"Run {run_id} never scheduled node '{node}'")
+
+    if node == "market_audit":
+        if len(snapshot.values.get("target_countries") or []) < 2 or not snapshot.values.get("market_evidence"):
+            raise ValueError(f"Run {run_id} has no multi-market retrieval to re-audit; re-run multi_retrieval with --continue instead")
+        update = _combine_updates([NODES[node].invoke(payload, force) for payload in market_payloads(snapshot.values)])
+    else:
+        update = NODES[node].invoke(snapshot.values, force)
+    config = graph.update_state(config, update, as_node=node)
+    return graph.get_state(config).values
 
-# Compile
-app = workflow.compile()
+# Compile (supports invoke/stream and native ainvoke/astream, checkpointed alike). With checkpoints enabled,
+# every call needs run_config(run_id).
+app = build_graph(get_checkpointer())
@@ -0,0 +1,147 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+from src.config import MODEL_PRICES, RUN_METRICS_ENABLED, RUN_METRICS_PATH
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD estimate from MODEL_PRICES; unknown models cost 0."""
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not matches:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[max(matches, key=len)]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class NodeUsage(BaseCallbackHandler):
+    """
+    Collects LLM usage for one graph node. Installed through a configure hook, so every
+    chain the node invokes reports here without the agents passing callbacks around.
+    """
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        llm_output = response.llm_output or {}
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                if not usage and llm_output.get("token_usage"):
+                    token_usage = llm_output["token_usage"]
+                    usage = {"input_tokens": token_usage.get("prompt_tokens", 0), "output_tokens": token_usage.get("completion_tokens", 0)}
+                model = (getattr(message, "response_metadata", None) or {}).get("model_name") or llm_output.get("model_name", "")
+                prompt_tokens = usage.get("input_tokens", 0)
+                completion_tokens = usage.get("output_tokens", 0)
+                with self._lock:
+                    self.prompt_tokens += prompt_tokens
+                    self.completion_tokens += completion_tokens
+                    self.cost_usd += estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            self.llm_calls += 1
+
+    def on_retry(self, retry_state, **kwargs: Any) -> None:
+        self.record_retry()
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_cache(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+_current_usage: ContextVar[Optional[NodeUsage]] = ContextVar("node_usage", default=None)
+register_configure_hook(_current_usage, inheritable=True)
+
+
+def current_usage() -> Optional[NodeUsage]:
+    """The collector of the node currently executing, if any (used by the cache and retry layers)."""
+    return _current_usage.get()
+
+
+@contextmanager
+def track_node():
+    """Yields a dict that holds {wall_s, tokens, retries, cache hits, cost} once the block exits."""
+    usage = NodeUsage()
+    token = _current_usage.set(usage)
+    record: Dict[str, Any] = {}
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _current_usage.reset(token)
+        record.update({"wall_s": round(time.perf_counter() - started, 4), **usage.as_dict()})
+
+
+def with_node_metrics(update: Dict[str, Any], node: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Adds the node's record under metrics["nodes"][node] of a partial state update."""
+    metrics = dict(update.get("metrics") or {})
+    metrics["nodes"] = {node: record}
+    return {**update, "metrics": metrics}
+
+
+def summarize(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Run totals over all node records."""
+    nodes = metrics.get("nodes", {})
+    totals = {key: sum(n.get(key, 0) for n in nodes.values()) for key in (
+        "llm_calls", "prompt_tokens", "completion_tokens", "total_tokens", "retries", "cache_hits", "cache_misses"
+    )}
+    totals["cost_usd"] = round(sum(n.get("cost_usd", 0.0) for n in nodes.values()), 6)
+    totals["node_wall_s"] = round(sum(n.get("wall_s", 0.0) for n in nodes.values()), 4)
+    if "start_time" in metrics:
+        totals["elapsed_s"] = round(metrics.get("end_time", time.time()) - metrics["start_time"], 4)
+    return totals
+
+
+_export_lock = threading.Lock()
+
+
+def export_run_metrics(state: Dict[str, Any], path: str = RUN_METRICS_PATH, **extra: Any) -> Optional[Dict[str, Any]]:
+    """Appends one JSON line describing a finished run; returns the record (None when disabled)."""
+    if not RUN_METRICS_ENABLED:
+        return None
+    metrics = state.get("metrics", {})
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **extra,
+        "product_name": state.get("product_info", {}).get("product_name") or state.get("user_input", {}).get("product_name", ""),
+        "risk_level": state.get("compliance_report", {}).get("risk_level", "UNKNOWN"),
+        "totals": summarize(metrics),
+        "nodes": metrics.get("nodes", {}),
+    }
+    try:
+        with _export_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    except OSError as e:
+        print(f"Run metrics export failed: {e}")
+    return record
@@ -0,0 +1,77 @@
+"""
+Operator CLI for checkpointed runs (CHECKPOINT_PATH).
+
+Usage:
+    python -m src.runs list
+    python -m src.runs show RUN_ID
+    python -m src.runs resume RUN_ID                      # continue from the last successful node
+    python -m src.runs rerun RUN_ID listing_generator     # re-execute one node against the saved state
+    python -m src.runs rerun RUN_ID compliance --continue # ...and everything downstream of it
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def summarize_state(run_id: str, snapshot) -> dict:
+    values = snapshot.values or {}
+    return {
+        "run_id": run_id,
+        "product_name": values.get("user_input", {}).get("product_name", ""),
+        "risk_level": values.get("compliance_report", {}).get("risk_level", "UNKNOWN"),
+        "completed_nodes": list(values.get("metrics", {}).get("nodes", {})),
+        "next": list(snapshot.next),
+        "status": "pending" if snapshot.next else "finished",
+        "updated_at": snapshot.created_at,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, resume or partially re-run checkpointed analyses.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Latest checkpoint of every run")
+    for name in ("show", "resume"):
+        sub.add_parser(name).add_argument("run_id")
+    rerun = sub.add_parser("rerun", help="Re-execute a single node against the saved state")
+    rerun.add_argument("run_id")
+    rerun.add_argument("node")
+    rerun.add_argument("--continue", dest="continue_run", action="store_true", help="Also run the downstream nodes")
+    parser.add_argument("--fake-llm", action="store_true", help="Use the offline fake LLM (LLM_PROVIDER=fake)")
+    args = parser.parse_args(argv)
+
+    if args.fake_llm:
+        os.environ["LLM_PROVIDER"] = "fake"
+
+    from src.orchestrator import app, get_checkpointer, rerun_node, resume_run, run_config
+
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        parser.error("Checkpoints are disabled (CHECKPOINT_ENABLED=false).")
+
+    if args.command == "list":
+        latest = {}
+        for checkpoint in checkpointer.list(None):
+            latest.setdefault(checkpoint.config["configurable"]["thread_id"], checkpoint)
+        for run_id in latest:
+            print(json.dumps(summarize_state(run_id, app.get_state(run_config(run_id)))))
+        return
+
+    if args.command == "show":
+        print(json.dumps(summarize_state(args.run_id, app.get_state(run_config(args.run_id))), indent=2))
+        return
+
+    try:
+        if args.command == "resume":
+            resume_run(args.run_id)
+        else:
+            rerun_node(args.run_id, args.node, continue_run=args.continue_run)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(summarize_state(args.run_id, app.get_state(run_config(args.run_id))), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import time
+import threading
+from typing import Any, Dict, Optional
+
+# Stage timings since process start, e.g. {"imports_s": 1.2, "retriever_s": 3.4}
+_report: Dict[str, Any] = {"status": "cold"}
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_lock = threading.Lock()
+
+
+def record(stage: str, seconds: float):
+    _report[f"{stage}_s"] = round(seconds, 3)
+
+
+def _warm_up():
+    from src.tools.retrieval import get_policy_retriever
+    from src.agents.intake import intake_agent
+    from src.agents.compliance import compliance_agent
+    from src.agents.listing_generator import listing_generator_agent
+    from src.agents.eval import eval_agent
+
+    started = time.perf_counter()
+    try:
+        # Index sync (and the chromadb import) is the slow part; it must not block the first render
+        get_policy_retriever().reinitialize()
+        record("retriever", time.perf_counter() - started)
+
+        clients_started = time.perf_counter()
+        for agent in (intake_agent, compliance_agent, listing_generator_agent, eval_agent):
+            agent.llm  # Builds the lazy client
+        record("llm_clients", time.perf_counter() - clients_started)
+        _report["status"] = "ready"
+    except Exception as e:
+        # Not fatal: the first analysis builds whatever is still missing
+        _report["status"] = "failed"
+        _report["error"] = str(e)
+    record("warmup", time.perf_counter() - started)
+    print(f"Startup report: {startup_report()}")
+
+
+def start_background_warmup() -> threading.Thread:
+    """Starts the warm-up once per process (idempotent) and returns its thread."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _report["status"] = "warming"
+            _warmup_thread = threading.Thread(target=_warm_up, name="warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def startup_report() -> Dict[str, Any]:
+    """Snapshot of the stage timings and warm-up status."""
+    return dict(_report)
@@ -1,4 +1,18 @@
-from typing import TypedDict, List, Dict, Any, Optional
+import operator
+from typing import Annotated, TypedDict, List, Dict, Any, Optional
+
+# Reducers: nodes in parallel branches may write the same key in one step.
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursive merge, so parallel nodes can each add their entry under metrics["nodes"]."""
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = merge_dicts(merged[key], value)
+        merged[key] = value
+    return merged
+
+def keep_last(left: Any, right: Any) -> Any:
+    return right
 
 class ProductInfo(TypedDict):
     target_country: str
@@ -14,6 +28,7 @@ class EvidenceItem(TypedDict):
     id: str
     content: str
     source: str
+    section: str  # Heading path within the source, e.g. "FDA Claims > Disease Claims"
     url: str
     date: str
     score: str  # High/Medium/Low
@@ -53,12 +68,17 @@ class AgentState(TypedDict):
     user_input: Dict[str, Any]
     product_info: ProductInfo
     intake_warning: Optional[str] # For category consistency check
+    target_countries: List[str]  # Markets to audit; more than one enables the multi-market fan-out
+    prescreen: Dict[str, Any]  # {blocked, hits}: deterministic hard-ban rule hits
     retrieval_queries: List[str]
     evidence: List[EvidenceItem]
     compliance_report: ComplianceReport
     market_data: Dict[str, Any]
     listings: ListingsCollection
     eval_report: Dict[str, Any]
-    debug_logs: List[str]
-    step_progress: str  # Current step name
-    metrics: Dict[str, float] # For cost/time tracking
+    market_evidence: Dict[str, Any]  # {country: {retrieval_queries, evidence}} from the shared multi-market retrieval
+    markets: Annotated[Dict[str, Any], merge_dicts]  # {country: audit}: written concurrently by the per-market branches
+    market_matrix: List[Dict[str, Any]]  # One comparison row per market
+    debug_logs: Annotated[List[str], operator.add]  # Nodes return only their new lines
+    step_progress: Annotated[str, keep_last]  # Current step name
+    metrics: Annotated[Dict[str, Any], merge_dicts] # For cost/time tracking
@@ -0,0 +1,62 @@
+import re
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring over policy chunks.
+    Exact regulatory terms ("CBD", "GMP", "mercury") score directly, with no embedding call.
+    """
+
+    def __init__(self, chunks: List[Dict[str, str]], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks  # [{"id", "content", "source"}]
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        for doc_idx, chunk in enumerate(chunks):
+            tokens = tokenize(chunk["content"])
+            self.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((doc_idx, tf))
+        self.avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.chunks) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Dict[str, str], float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_idx, tf in postings:
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_idx] / self.avg_doc_length
+                scores[doc_idx] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.chunks[doc_idx], score) for doc_idx, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, str]]], k: int, rrf_k: int = 60) -> List[Dict[str, str]]:
+    """Fuses ranked result lists (best first) by summing 1 / (rrf_k + rank); dedupes on chunk id."""
+    scores: Dict[str, float] = defaultdict(float)
+    docs: Dict[str, Dict[str, str]] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc["id"]] += 1.0 / (rrf_k + rank)
+            docs.setdefault(doc["id"], doc)
+    fused = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)[:k]
+    return [docs[doc_id] for doc_id in fused]
@@ -0,0 +1,148 @@
+import os
+import time
+import array
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from src.config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCacheStore:
+    """
+    Disk-backed (SQLite) vector cache with LRU eviction once max_entries is exceeded.
+    One store per file is shared by every CachedEmbeddings wrapper in the process.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        with self._lock:
+            placeholders = ",".join("?" * len(keys))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys
+            ).fetchall()
+            found = {key: array.array("f", blob).tolist() for key, blob in rows}
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+            return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        with self._lock:
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(k, array.array("f", v).tobytes(), now) for k, v in items.items()],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+_stores: Dict[str, EmbeddingCacheStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_cache_store(path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES) -> EmbeddingCacheStore:
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = EmbeddingCacheStore(path, max_entries)
+        return _stores[path]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object so indexing (embed_documents) and search (embed_query)
+    share one cache keyed by (model, hash of whitespace-normalized text).
+    Misses are embedded in a single batched call to the underlying model.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, store: Optional[EmbeddingCacheStore] = None):
+        self.underlying = underlying
+        self.model = model
+        self.store = store or get_cache_store()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, texts: List[str]):
+        keys = [self._key(t) for t in texts]
+        found = self.store.get_many(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        self.store.misses += len(missing)
+        self.store.hits += len(texts) - len(missing)
+        return keys, found, missing
+
+    def _store_fresh(self, missing: Dict[str, str], vectors: List[List[float]]) -> Dict[str, List[float]]:
+        # Round-trip through float32 so fresh and cached results are bit-identical
+        fresh = {k: array.array("f", v).tolist() for k, v in zip(missing, vectors)}
+        self.store.put_many(fresh)
+        return fresh
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            found.update(self._store_fresh(missing, vectors))
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            found.update(await asyncio.to_thread(self._store_fresh, missing, vectors))
+        return [found[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def embedding_cache_stats() -> Dict[str, float]:
+    """Hit/miss counters of the default embedding cache."""
+    return get_cache_store().stats()
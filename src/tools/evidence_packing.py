@@ -0,0 +1,114 @@
+import os
+import json
+import math
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from src.tools.bm25 import tokenize
+
+# Fields the compliance prompt actually needs; the rest (url, date, score, query) is UI metadata
+PROMPT_FIELDS = ("id", "content", "source")
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Encoding files unavailable (e.g. air-gapped host): fall back to the ~4 chars/token estimate
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = _encoder()
+    if encoder is None:
+        return math.ceil(len(text) / 4)
+    return len(encoder.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoder = _encoder()
+    if encoder is None:
+        return text[:max_tokens * 4]
+    return encoder.decode(encoder.encode(text)[:max_tokens])
+
+
+def _truncated(candidate: Dict, token_budget: int):
+    """The candidate with its content cut to fit the budget alone, or None if even its metadata does not fit."""
+    room = token_budget - 2 - count_tokens(json.dumps({**candidate["item"], "content": ""}))
+    while room > 0:
+        item = {**candidate["item"], "content": truncate_tokens(candidate["item"].get("content", ""), room)}
+        tokens = count_tokens(json.dumps(item))
+        if tokens + 2 <= token_budget:
+            return {**candidate, "item": item, "tokens": tokens}
+        room -= tokens + 2 - token_budget  # JSON escaping can add a few tokens
+    return None
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(v * b.get(t, 0) for t, v in a.items())
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+def compact_item(item: Dict) -> Dict:
+    compact = {field: item[field] for field in PROMPT_FIELDS if field in item}
+    if "source" in compact:
+        compact["source"] = os.path.basename(compact["source"])
+    return compact
+
+
+def pack_evidence(evidence: List[Dict], query_text: str, token_budget: int, mmr_lambda: float = 0.7) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Selects evidence for the prompt with maximal marginal relevance under a token budget.
+
+    Relevance is term cosine against the product/query text; the diversity penalty is the
+    highest similarity to an already selected chunk, so near-duplicate chunks are dropped
+    first. Selected items keep their original evidence IDs (citations stay valid) and are
+    returned in their original order with redundant metadata stripped. If no chunk fits
+    whole, the most relevant one is truncated to the budget rather than sending no evidence.
+    """
+    tokens_before = count_tokens(json.dumps(evidence))
+    query_vector = Counter(tokenize(query_text))
+    candidates = []
+    for position, item in enumerate(evidence):
+        compact = compact_item(item)
+        candidates.append({
+            "position": position,
+            "item": compact,
+            "vector": Counter(tokenize(item.get("content", ""))),
+            "tokens": count_tokens(json.dumps(compact)),
+        })
+    for c in candidates:
+        c["relevance"] = _cosine(query_vector, c["vector"])
+
+    selected = []
+    used_tokens = 2  # Enclosing brackets
+    top = max(candidates, key=lambda c: c["relevance"], default=None)
+    while candidates:
+        def mmr(c):
+            redundancy = max((_cosine(c["vector"], s["vector"]) for s in selected), default=0.0)
+            return mmr_lambda * c["relevance"] - (1 - mmr_lambda) * redundancy
+
+        best = max(candidates, key=mmr)
+        candidates.remove(best)
+        if used_tokens + best["tokens"] <= token_budget:
+            selected.append(best)
+            used_tokens += best["tokens"]
+
+    if not selected and top is not None:
+        truncated = _truncated(top, token_budget)
+        if truncated is not None:
+            selected.append(truncated)
+
+    packed = [c["item"] for c in sorted(selected, key=lambda c: c["position"])]
+    tokens_after = count_tokens(json.dumps(packed))
+    return packed, {
+        "evidence_items_in": len(evidence),
+        "evidence_items_packed": len(packed),
+        "evidence_tokens_before": tokens_before,
+        "evidence_tokens_after": tokens_after,
+        "evidence_tokens_saved": tokens_before - tokens_after,
+    }
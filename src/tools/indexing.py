@@ -0,0 +1,209 @@
+import os
+import re
+import glob
+import json
+import hashlib
+from typing import Dict, List, Tuple
+from langchain_core.documents import Document
+from src.config import DATA_DIR, CHROMA_DB_DIR, CHUNK_TOKEN_TARGET
+from src.tools.markdown_chunker import CHUNKER_VERSION, MarkdownChunker
+
+MANIFEST_FILE = "index_manifest.json"
+MANIFEST_VERSION = 2  # 2: chunks carry policy front-matter metadata
+LEXICAL_FILE = "lexical_chunks.json"
+
+# Identifies how chunks were cut; an index built by a different chunker is rebuilt
+CHUNKER_ID = f"{CHUNKER_VERSION}:{CHUNK_TOKEN_TARGET}"
+
+# Policy front-matter keys indexed as chunk metadata. A missing country, marketplace or
+# category means the policy applies to all of them.
+POLICY_METADATA = ("country", "marketplace", "category", "effective_date")
+ALL_MARKETS = "ALL"
+INLINE_COMMENT_RE = re.compile(r"(?:^|\s)#")
+FRONT_MATTER_RE = re.compile(r"\A---[ \t]*\r?\n(.*?)\r?\n---[ \t]*(?:\r?\n|\Z)", re.S)
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_front_matter(text: str) -> Tuple[Dict[str, str], str]:
+    """
+    Splits a leading `---` block of `key: value` lines off a policy file. As in YAML, a `#`
+    after whitespace starts a comment. Returns (metadata with every POLICY_METADATA key, body).
+    Country codes are upper-cased.
+    """
+    metadata = {key: ALL_MARKETS for key in POLICY_METADATA}
+    metadata["effective_date"] = ""
+    match = FRONT_MATTER_RE.match(text)
+    if not match:
+        return metadata, text
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        key = key.strip().lower()
+        value = INLINE_COMMENT_RE.split(value, 1)[0]
+        if sep and key in POLICY_METADATA and value.strip():
+            metadata[key] = value.strip().strip("\"'")
+    metadata["country"] = metadata["country"].upper()
+    return metadata, text[match.end():]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PolicyIndexer:
+    """
+    Incremental, content-hashed indexer for the policy corpus.
+
+    The manifest (stored next to the Chroma DB) maps each source file to its content
+    hash and the ids of its chunks. Chunk ids are hashes of (source, chunk text), so a
+    sync only embeds chunks that are new, deletes chunks that disappeared, and never
+    touches files whose hash is unchanged. A change of chunker (CHUNKER_ID) rebuilds.
+    """
+
+    def __init__(self, vector_store, embedding_model: str, data_dir: str = DATA_DIR, persist_dir: str = CHROMA_DB_DIR):
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model
+        self.data_dir = data_dir
+        self.manifest_path = os.path.join(persist_dir, MANIFEST_FILE)
+        self.lexical_path = os.path.join(persist_dir, LEXICAL_FILE)
+        self.text_splitter = MarkdownChunker(CHUNK_TOKEN_TARGET)
+
+    @staticmethod
+    def _load_json(path: str) -> Dict:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    @staticmethod
+    def _save_json(path: str, data: Dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def load_manifest(self) -> Dict:
+        return self._load_json(self.manifest_path)
+
+    def save_manifest(self, manifest: Dict):
+        self._save_json(self.manifest_path, manifest)
+
+    def source_files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.data_dir, "**", "*.md"), recursive=True))
+
+    def chunk_file(self, path: str) -> Dict[str, Document]:
+        """
+        Splits one source file into chunks keyed by content-hash id. The front-matter is not
+        embedded; it becomes the metadata of every chunk (and part of the id, so a changed
+        jurisdiction replaces the chunks).
+        """
+        with open(path, encoding="utf-8") as f:
+            metadata, body = parse_front_matter(f.read())
+        docs = [Document(page_content=body, metadata={"source": path, **metadata})]
+        rel_path = os.path.relpath(path, self.data_dir)
+        metadata_key = json.dumps(metadata, sort_keys=True)
+        chunks = {}
+        for chunk in self.text_splitter.split_documents(docs):
+            chunks.setdefault(sha256_text(f"{rel_path}\0{metadata_key}\0{chunk.page_content}")[:32], chunk)
+        return chunks
+
+    def _reset_store(self):
+        existing = self.vector_store.get(include=[])["ids"]
+        if existing:
+            self.vector_store.delete(ids=existing)
+
+    def sync(self) -> Dict[str, int]:
+        """Brings the store in line with the corpus on disk. Returns change counts."""
+        manifest = self.load_manifest()
+        if (manifest.get("version") != MANIFEST_VERSION or manifest.get("embedding_model") != self.embedding_model
+                or manifest.get("chunker") != CHUNKER_ID):
+            # Unknown layout, vectors from a different model or differently cut chunks: rebuild once from scratch
+            self._reset_store()
+            manifest = {}
+        indexed_files = manifest.get("files", {})
+
+        stats = {"files_changed": 0, "files_removed": 0, "chunks_added": 0, "chunks_deleted": 0}
+        current_files = {}
+        to_add: List[Document] = []
+        add_ids: List[str] = []
+        to_delete: List[str] = []
+
+        for path in self.source_files():
+            rel_path = os.path.relpath(path, self.data_dir)
+            file_hash = file_sha256(path)
+            previous = indexed_files.get(rel_path)
+            if previous and previous["sha256"] == file_hash:
+                current_files[rel_path] = previous
+                continue
+
+            chunks = self.chunk_file(path)
+            old_ids = set(previous["chunks"]) if previous else set()
+            for cid, chunk in chunks.items():
+                if cid not in old_ids:
+                    to_add.append(chunk)
+                    add_ids.append(cid)
+            to_delete.extend(old_ids - set(chunks))
+            current_files[rel_path] = {"sha256": file_hash, "chunks": list(chunks)}
+            stats["files_changed"] += 1
+
+        for rel_path, previous in indexed_files.items():
+            if rel_path not in current_files:
+                to_delete.extend(previous["chunks"])
+                stats["files_removed"] += 1
+
+        if to_delete:
+            self.vector_store.delete(ids=to_delete)
+        if to_add:
+            self.vector_store.add_documents(to_add, ids=add_ids)
+        stats["chunks_added"] = len(to_add)
+        stats["chunks_deleted"] = len(to_delete)
+
+        self.save_manifest({
+            "version": MANIFEST_VERSION,
+            "embedding_model": self.embedding_model,
+            "chunker": CHUNKER_ID,
+            "files": current_files,
+        })
+        return stats
+
+    def sync_lexical(self) -> List[Dict[str, str]]:
+        """
+        Keeps the chunk texts for the BM25 index in a JSON file next to the store.
+        Needs no embeddings, so lexical search works even when the vector store cannot be built.
+        Only files whose hash changed are re-chunked. Returns every current chunk.
+        """
+        previous = self._load_json(self.lexical_path)
+        current_layout = previous.get("version") == MANIFEST_VERSION and previous.get("chunker") == CHUNKER_ID
+        indexed_files = previous.get("files", {}) if current_layout else {}
+
+        current_files = {}
+        for path in self.source_files():
+            rel_path = os.path.relpath(path, self.data_dir)
+            file_hash = file_sha256(path)
+            if rel_path in indexed_files and indexed_files[rel_path]["sha256"] == file_hash:
+                current_files[rel_path] = indexed_files[rel_path]
+                continue
+            current_files[rel_path] = {
+                "sha256": file_hash,
+                "chunks": [
+                    {
+                        "id": cid,
+                        "content": chunk.page_content,
+                        "source": chunk.metadata.get("source", rel_path),
+                        "section_path": chunk.metadata.get("section_path", ""),
+                        **{key: chunk.metadata.get(key, "") for key in POLICY_METADATA},
+                    }
+                    for cid, chunk in self.chunk_file(path).items()
+                ],
+            }
+
+        if current_files != indexed_files:
+            self._save_json(self.lexical_path, {"version": MANIFEST_VERSION, "chunker": CHUNKER_ID, "files": current_files})
+        return [chunk for entry in current_files.values() for chunk in entry["chunks"]]
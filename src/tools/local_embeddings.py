@@ -0,0 +1,54 @@
+import re
+import zlib
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+WORD_RE = re.compile(r"[0-9a-z]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline, deterministic embeddings (EMBEDDING_PROVIDER=local).
+
+    Word unigrams/bigrams and character n-grams are hashed (CRC32, signed) into a
+    fixed-size vector with sublinear term frequency, then L2-normalized. Stateless,
+    so documents and queries share one space without fitting on the corpus, and no
+    network call is ever made.
+    """
+
+    def __init__(self, dim: int = 1024, char_ngrams: tuple = (3, 4, 5)):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+
+    @property
+    def model_name(self) -> str:
+        return f"local-hashing-v1-{self.dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = WORD_RE.findall(text.lower())
+        features = [f"w:{w}" for w in words]
+        features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            for n in self.char_ngrams:
+                features += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        features = self._features(text)
+        if not features:
+            return [0.0] * self.dim
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint64, count=len(features))
+        counts = np.zeros(self.dim, dtype=np.float64)
+        signs = np.where(hashes & 1, 1.0, -1.0)
+        np.add.at(counts, (hashes >> 1) % self.dim, signs)
+        vector = np.sign(counts) * np.log1p(np.abs(counts))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,122 @@
+import re
+from itertools import groupby
+from typing import List, Tuple
+from langchain_core.documents import Document
+from src.tools.evidence_packing import count_tokens
+
+# Bump when the splitting rules change: the index manifest is keyed on it, so a new
+# version re-chunks and re-embeds the corpus once
+CHUNKER_VERSION = "md-sections-v1"
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+SECTION_SEPARATOR = " > "
+
+
+def _sections(text: str) -> List[Tuple[Tuple[str, ...], str]]:
+    """Splits markdown into (heading path, text) sections. Headings inside code fences are ignored."""
+    sections = []
+    path: List[Tuple[int, str]] = []
+    lines: List[str] = []
+    in_fence = False
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            sections.append((tuple(title for _, title in path), body))
+        lines.clear()
+
+    for line in text.splitlines():
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        heading = None if in_fence else HEADING_RE.match(line)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            path = [(lvl, title) for lvl, title in path if lvl < level] + [(level, heading.group(2))]
+        lines.append(line)
+    flush()
+    return sections
+
+
+def _common_path(paths: List[Tuple[str, ...]]) -> Tuple[str, ...]:
+    common = paths[0]
+    for path in paths[1:]:
+        n = 0
+        while n < min(len(common), len(path)) and common[n] == path[n]:
+            n += 1
+        common = common[:n]
+    return common
+
+
+class MarkdownChunker:
+    """
+    Heading-aware chunker for the policy markdown. A heading and everything nested under it
+    stay in one chunk when they fit token_target; otherwise the chunk is cut at the next
+    heading level down, so sibling sections are never mixed. Sections still longer than the
+    target are split on paragraph, then line, boundaries. There is no overlap, and every
+    chunk carries the heading path it came from as `section_path` metadata.
+    """
+
+    def __init__(self, token_target: int):
+        self.token_target = token_target
+
+    def _split_long(self, text: str) -> List[str]:
+        """Packs paragraphs (or lines, for an oversized paragraph) of one section up to the target."""
+        pieces = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            if count_tokens(paragraph) <= self.token_target:
+                pieces.append(paragraph)
+            else:
+                pieces.extend(line for line in paragraph.splitlines() if line.strip())
+        packed, current = [], []
+        for piece in pieces:
+            if current and count_tokens("\n\n".join(current + [piece])) > self.token_target:
+                packed.append("\n\n".join(current))
+                current = []
+            current.append(piece)
+        if current:
+            packed.append("\n\n".join(current))
+        return packed
+
+    def _pack(self, sections: List[Tuple[Tuple[str, ...], str]], depth: int) -> List[Tuple[Tuple[str, ...], str]]:
+        """Chunks a run of sections sharing the first `depth` headings: whole if it fits, else per subsection."""
+        text = "\n\n".join(body for _, body in sections)
+        if count_tokens(text) <= self.token_target:
+            return [(_common_path([path for path, _ in sections]), text)]
+
+        chunks = []
+        for key, group in groupby(sections, key=lambda section: section[0][:depth + 1] if len(section[0]) > depth else None):
+            group = list(group)
+            if key is not None:
+                chunks.extend(self._pack(group, depth + 1))
+                continue
+            for path, body in group:  # The heading's own text, before its first subsection
+                chunks.extend((path, piece) for piece in self._split_long(body))
+        return chunks
+
+    def split_text(self, text: str) -> List[Tuple[str, str]]:
+        """Returns (section path, chunk text) pairs in document order."""
+        sections = _sections(text)
+        if not sections:
+            return []
+        chunks = []
+        pending: List[Tuple[Tuple[str, ...], str]] = []
+        for path, body in self._pack(sections, 0):
+            # A bare heading (e.g. the document title) is carried into the next chunk
+            pending.append((path, body))
+            if all(HEADING_RE.match(line) for line in body.splitlines() if line.strip()):
+                continue
+            merged_path = _common_path([p for p, _ in pending]) if len(pending) > 1 else path
+            chunks.append((SECTION_SEPARATOR.join(merged_path), "\n\n".join(b for _, b in pending)))
+            pending = []
+        if pending:
+            chunks.append((SECTION_SEPARATOR.join(pending[0][0]), "\n\n".join(b for _, b in pending)))
+        return chunks
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        return [
+            Document(page_content=text, metadata={**doc.metadata, "section_path": section_path})
+            for doc in documents
+            for section_path, text in self.split_text(doc.page_content)
+        ]
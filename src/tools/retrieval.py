@@ -1,66 +1,245 @@
 import os
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain_text_splitters import CharacterTextSplitter
-from langchain_chroma import Chroma
-from src.config import DATA_DIR, CHROMA_DB_DIR, OPENAI_API_KEY
-from src.llm_factory import get_embeddings
+import re
+import asyncio
+import glob
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+from src.config import DATA_DIR, CHROMA_DB_DIR, OPENAI_API_KEY, RETRIEVAL_MODE, HYBRID_LEXICAL_SKIP_SCORE
+from src.tools.bm25 import BM25Index, reciprocal_rank_fusion
+from src.tools.indexing import ALL_MARKETS, PolicyIndexer
+from src.llm_factory import get_embeddings, get_embedding_config
+
+def corpus_version() -> str:
+    """Cheap version stamp of the policy corpus (path, size, mtime of every markdown file)."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "**", "*.md"), recursive=True)):
+        stat = os.stat(path)
+        digest.update(f"{os.path.relpath(path, DATA_DIR)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
 
 class PolicyRetriever:
     def __init__(self):
         self.embeddings = None
         self.vector_store = None
+        self.lexical_index = None
+        self.lexical_chunks = []
+        self._lexical_partitions = {}
+        self.fingerprint = None
+        self._lock = threading.Lock()
         # Initialize immediately if env vars are present
         self.reinitialize()
 
-    def reinitialize(self):
-        """Re-initializes the vector store with current environment variables."""
+    def _current_fingerprint(self) -> tuple:
+        api_key, base_url, model = get_embedding_config()
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else None
+        return (base_url, model, key_hash, corpus_version())
+
+    def reinitialize(self, force: bool = False):
+        """
+        Re-initializes the vector store with current environment variables.
+        No-op unless the (base URL, embedding model, API key hash, corpus version)
+        fingerprint changed since the last build, or force=True.
+        """
+        fingerprint = self._current_fingerprint()
+        if not force and fingerprint == self.fingerprint:
+            return
+
+        with self._lock:
+            if not force and fingerprint == self.fingerprint:
+                return  # Another thread rebuilt while we waited
+            self._build()
+            self.fingerprint = fingerprint
+
+    def _build(self):
+        # The lexical index needs no embeddings, so it is always available
+        self.lexical_chunks = self._load_lexical_chunks()
+        self.lexical_index = BM25Index(self.lexical_chunks) if self.lexical_chunks else None
+        self._lexical_partitions = {}
+
         self.embeddings = get_embeddings()
         if not self.embeddings:
-            print("Warning: API Key not found. RAG will not work.")
+            print("Warning: API Key not found. Dense retrieval disabled; using lexical (BM25) search only. "
+                  "Set EMBEDDING_PROVIDER=local for offline dense retrieval.")
             self.vector_store = None
             return
 
-        if os.path.exists(CHROMA_DB_DIR) and os.listdir(CHROMA_DB_DIR):
-            self.vector_store = Chroma(persist_directory=CHROMA_DB_DIR, embedding_function=self.embeddings)
-        else:
-            self._index_documents()
+        from langchain_chroma import Chroma  # Deferred: chromadb is slow to import
+        self.vector_store = Chroma(persist_directory=self._store_dir(), embedding_function=self.embeddings)
+        self._index_documents()
+
+    def _store_dir(self) -> str:
+        """One Chroma DB per embedding model: vector sizes differ, and switching back needs no re-embed."""
+        _, _, model = get_embedding_config()
+        return os.path.join(CHROMA_DB_DIR, re.sub(r"[^0-9A-Za-z._-]+", "_", model))
+
+    def _load_lexical_chunks(self) -> List[dict]:
+        if not os.path.exists(DATA_DIR):
+            return []
+        return PolicyIndexer(None, embedding_model="bm25").sync_lexical()
+
+    def _lexical_partition(self, country: Optional[str]):
+        """BM25 index over one country's policies plus the ones that apply everywhere (built once per country)."""
+        if not country:
+            return self.lexical_index
+        country = country.upper()
+        if country not in self._lexical_partitions:
+            chunks = [c for c in self.lexical_chunks if c.get("country", ALL_MARKETS) in (country, ALL_MARKETS)]
+            self._lexical_partitions[country] = BM25Index(chunks) if chunks else None
+        return self._lexical_partitions[country]
 
     def _index_documents(self):
-        print("Indexing policy documents...")
+        """Incrementally syncs the store with data/policies (only changed chunks are embedded)."""
         if not os.path.exists(DATA_DIR):
             print(f"Data directory {DATA_DIR} does not exist. Skipping index.")
             return
 
-        loader = DirectoryLoader(DATA_DIR, glob="**/*.md", loader_cls=TextLoader)
-        docs = loader.load()
-        
-        if not docs:
-            print("No documents found to index.")
-            return
+        _, _, model = get_embedding_config()
+        stats = PolicyIndexer(self.vector_store, embedding_model=model, persist_dir=self._store_dir()).sync()
+        print(f"Policy index synced: {stats}")
+
+    def mode(self) -> str:
+        """Effective retrieval mode: RETRIEVAL_MODE, degraded to lexical when embeddings are unavailable."""
+        if RETRIEVAL_MODE == "lexical" or not self.vector_store:
+            return "lexical"
+        return RETRIEVAL_MODE
+
+    def search(self, query: str, k: int = 5, country: Optional[str] = None):
+        return [{"content": r["content"], "source": r["source"]} for r in self.search_many([query], k=k, country=country)]
+
+    def _unavailable(self, queries_by_country: Dict[Optional[str], List[str]]) -> List[dict]:
+        return [
+            {"content": "Retrieval unavailable (No API Key or Index)", "source": "N/A", "query": q, "market": country}
+            for country, queries in queries_by_country.items() for q in queries
+        ]
 
-        text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        chunks = text_splitter.split_documents(docs)
-        
-        self.vector_store = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embeddings,
-            persist_directory=CHROMA_DB_DIR
+    def _lexical_rankings(self, queries: List[str], k: int, country: Optional[str] = None) -> Dict[str, List[Tuple[dict, float]]]:
+        index = self._lexical_partition(country)
+        if self.mode() == "vector" or not index:
+            return {}
+        return {q: index.search(q, k=k) for q in queries}
+
+    def _dense_queries(self, queries: List[str], lexical: Dict[str, List[Tuple[dict, float]]]) -> List[str]:
+        """Queries that still need an embedding round trip (none in lexical mode)."""
+        if self.mode() == "lexical":
+            return []
+        if HYBRID_LEXICAL_SKIP_SCORE <= 0:
+            return list(queries)
+        # Keyword-heavy queries with a strong BM25 hit skip the dense search entirely
+        return [q for q in queries if not lexical.get(q) or lexical[q][0][1] < HYBRID_LEXICAL_SKIP_SCORE]
+
+    def _query_collection(self, queries: List[str], vectors: List[List[float]], k: int, country: Optional[str] = None) -> Dict[str, List[dict]]:
+        # langchain_chroma only exposes single-vector search; the raw collection accepts a batch
+        where = {"country": {"$in": [country.upper(), ALL_MARKETS]}} if country else None
+        response = self.vector_store._collection.query(
+            query_embeddings=vectors, n_results=k, where=where, include=["documents", "metadatas"]
         )
-        print("Indexing complete.")
+        rankings = {}
+        for query, ids, documents, metadatas in zip(queries, response["ids"], response["documents"], response["metadatas"]):
+            rankings[query] = [
+                {
+                    "id": doc_id,
+                    "content": content,
+                    "source": (metadata or {}).get("source", "Unknown"),
+                    "effective_date": (metadata or {}).get("effective_date", ""),
+                    "section_path": (metadata or {}).get("section_path", ""),
+                }
+                for doc_id, content, metadata in zip(ids, documents, metadatas)
+            ]
+        return rankings
 
-    def search(self, query: str, k: int = 5):
-        if not self.vector_store:
-            # Try to re-init just in case
+    def _fuse(self, queries: List[str], lexical: Dict[str, List[Tuple[dict, float]]], dense: Dict[str, List[dict]], k: int, country: Optional[str] = None) -> List[dict]:
+        results = []
+        for query in queries:
+            rankings = [r for r in ([doc for doc, _ in lexical.get(query, [])], dense.get(query, [])) if r]
+            fused = rankings[0][:k] if len(rankings) == 1 else reciprocal_rank_fusion(rankings, k=k)
+            results.extend(
+                {
+                    "content": doc["content"], "source": doc["source"], "section": doc.get("section_path", ""),
+                    "query": query, "market": country, "effective_date": doc.get("effective_date", "")
+                }
+                for doc in fused
+            )
+        return results
+
+    def _ready(self) -> bool:
+        if not self.vector_store and not self.lexical_index:
+            # Try to re-init just in case (no-op if nothing changed)
             self.reinitialize()
-            if not self.vector_store:
-                return [{"content": "Retrieval unavailable (No API Key or Index)", "source": "N/A"}]
-        
-        results = self.vector_store.similarity_search(query, k=k)
-        return [{"content": doc.page_content, "source": doc.metadata.get("source", "Unknown")} for doc in results]
+        return bool(self.vector_store or self.lexical_index)
+
+    def _plan(self, queries_by_country: Dict[Optional[str], List[str]], k: int):
+        """Lexical rankings per partition, plus the queries still needing dense search and their unique texts."""
+        lexical = {country: self._lexical_rankings(queries, k, country) for country, queries in queries_by_country.items()}
+        dense_queries = {country: self._dense_queries(queries, lexical[country]) for country, queries in queries_by_country.items()}
+        unique_texts = list(dict.fromkeys(q for queries in dense_queries.values() for q in queries))
+        return lexical, dense_queries, unique_texts
+
+    def _query_partitions(self, dense_queries: Dict[Optional[str], List[str]], vectors: Dict[str, List[float]], k: int) -> Dict[Optional[str], Dict[str, List[dict]]]:
+        return {
+            country: self._query_collection(queries, [vectors[q] for q in queries], k, country)
+            for country, queries in dense_queries.items() if queries
+        }
+
+    def _fuse_partitions(self, queries_by_country, lexical, dense, k: int) -> List[dict]:
+        return [
+            result for country, queries in queries_by_country.items()
+            for result in self._fuse(queries, lexical[country], dense.get(country, {}), k, country)
+        ]
+
+    def search_many(self, queries: List[str], k: int = 5, country: Optional[str] = None) -> List[dict]:
+        """
+        Batched hybrid retrieval. BM25 runs locally per query; queries needing dense search
+        share one embedding request and one multi-query collection lookup. The two rankings
+        are fused with reciprocal rank fusion. Results are tagged with their query.
+        With a country, only that market's policies (and those tagged ALL) are searched.
+        """
+        return self.search_partitioned({country: queries}, k=k)
+
+    async def asearch_many(self, queries: List[str], k: int = 5, country: Optional[str] = None) -> List[dict]:
+        """Async search_many: awaits the embedding request; local index lookups run in a worker thread."""
+        return await self.asearch_partitioned({country: queries}, k=k)
+
+    def search_partitioned(self, queries_by_country: Dict[Optional[str], List[str]], k: int = 5) -> List[dict]:
+        """
+        search_many for several markets at once: each country's queries search only its
+        partition, but identical query texts are embedded once, in a single request for all
+        markets. Results are tagged with their query and market.
+        """
+        if not self._ready():
+            return self._unavailable(queries_by_country)
+
+        lexical, dense_queries, unique_texts = self._plan(queries_by_country, k)
+        dense = {}
+        if unique_texts:
+            vectors = dict(zip(unique_texts, self.embeddings.embed_documents(unique_texts)))
+            dense = self._query_partitions(dense_queries, vectors, k)
+        return self._fuse_partitions(queries_by_country, lexical, dense, k)
+
+    async def asearch_partitioned(self, queries_by_country: Dict[Optional[str], List[str]], k: int = 5) -> List[dict]:
+        """Async search_partitioned."""
+        if not await asyncio.to_thread(self._ready):
+            return self._unavailable(queries_by_country)
+
+        lexical, dense_queries, unique_texts = self._plan(queries_by_country, k)
+        dense = {}
+        if unique_texts:
+            vectors = dict(zip(unique_texts, await self.embeddings.aembed_documents(unique_texts)))
+            dense = await asyncio.to_thread(self._query_partitions, dense_queries, vectors, k)
+        return self._fuse_partitions(queries_by_country, lexical, dense, k)
+
+# Singleton instance, built (and the index synced) on first use rather than at import
+_policy_retriever = None
+_policy_retriever_lock = threading.Lock()
 
-# Singleton instance
-policy_retriever = PolicyRetriever()
+def get_policy_retriever() -> PolicyRetriever:
+    global _policy_retriever
+    if _policy_retriever is None:
+        with _policy_retriever_lock:
+            if _policy_retriever is None:
+                _policy_retriever = PolicyRetriever()
+    return _policy_retriever
 
-def retrieve_policy(query: str) -> list:
+def retrieve_policy(query: str, country: Optional[str] = None) -> list:
     """Tool function to retrieve policy evidence."""
-    return policy_retriever.search(query)
+    return get_policy_retriever().search(query, country=country)
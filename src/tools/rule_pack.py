@@ -0,0 +1,80 @@
+import os
+import glob
+import json
+from typing import Any, Dict, List
+from src.config import DATA_DIR
+from src.tools.term_matcher import TermMatcher
+
+# ProductInfo fields a hard-ban term can appear in. Claims are marketing copy ("explosive
+# flavor") and are left to the compliance LLM, which reads them in context.
+SCREENED_FIELDS = ("product_name", "category", "material", "function")
+
+
+class RulePack:
+    """
+    Structured hard-ban rules compiled from the `*.rules.json` files that sit next to the
+    policy markdown. All rule terms share one TermMatcher, so screening a product is a
+    single pass per field. A rule's "exceptions" anywhere in the product disable it; its
+    "negations" ("cbd-free", "anti-counterfeit") only cancel the term occurrence they contain.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = {rule["id"]: rule for rule in rules}
+        self._term_rules: Dict[str, List[str]] = {}
+        for rule in rules:
+            for term in rule["terms"]:
+                self._term_rules.setdefault(term.lower(), []).append(rule["id"])
+        self.matcher = TermMatcher(self._term_rules)
+        self.exception_matcher = TermMatcher(t for rule in rules for t in rule.get("exceptions", []))
+        self._negation_rules: Dict[str, List[str]] = {}
+        for rule in rules:
+            for phrase in rule.get("negations", []):
+                self._negation_rules.setdefault(phrase.lower(), []).append(rule["id"])
+        self.negation_matcher = TermMatcher(self._negation_rules)
+
+    @classmethod
+    def load(cls, data_dir: str = DATA_DIR) -> "RulePack":
+        rules = []
+        for path in sorted(glob.glob(os.path.join(data_dir, "**", "*.rules.json"), recursive=True)):
+            with open(path, encoding="utf-8") as f:
+                pack = json.load(f)
+            source = os.path.join(os.path.dirname(path), pack.get("policy", os.path.basename(path)))
+            for rule in pack.get("rules", []):
+                rules.append({**rule, "source": source})
+        return cls(rules)
+
+    def screen(self, product_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Returns one hit per triggered rule: {rule_id, risk_level, term, field, reason, section, source}."""
+        texts = {field: str(product_info.get(field) or "") for field in SCREENED_FIELDS}
+        exceptions = self.exception_matcher.matched_terms(" \n".join(texts.values())) if len(self.exception_matcher) else set()
+
+        hits: Dict[str, Dict[str, Any]] = {}
+        for field, text in texts.items():
+            negated = self.negation_matcher.find_all(text) if len(self.negation_matcher) else []
+            for match in self.matcher.find_all(text):
+                for rule_id in self._term_rules[match.term]:
+                    rule = self.rules[rule_id]
+                    if rule_id in hits or any(e in exceptions for e in rule.get("exceptions", [])):
+                        continue
+                    if any(n.start <= match.start and match.end <= n.end and rule_id in self._negation_rules[n.term] for n in negated):
+                        continue
+                    hits[rule_id] = {
+                        "rule_id": rule_id,
+                        "risk_level": rule.get("risk_level", "RED"),
+                        "term": text[match.start:match.end],
+                        "field": field,
+                        "reason": rule["reason"],
+                        "section": rule.get("section", ""),
+                        "source": rule["source"],
+                    }
+        return list(hits.values())
+
+
+_rule_pack = None
+
+
+def get_rule_pack() -> RulePack:
+    global _rule_pack
+    if _rule_pack is None:
+        _rule_pack = RulePack.load()
+    return _rule_pack
@@ -0,0 +1,115 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+
+class TermMatch(NamedTuple):
+    term: str   # The term as given to the matcher
+    start: int  # Offsets into the original (unfolded) text, for UI highlighting
+    end: int
+
+
+def _fold(text: str) -> Tuple[str, List[int]]:
+    """Case-folds and collapses whitespace; returns the folded text and a folded->original index map."""
+    folded: List[str] = []
+    index_map: List[int] = []
+    for i, ch in enumerate(text):
+        if ch.isspace():
+            if folded and folded[-1] == " ":
+                continue
+            folded.append(" ")
+            index_map.append(i)
+            continue
+        for f in ch.casefold():
+            folded.append(f)
+            index_map.append(i)
+    return "".join(folded), index_map
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton over a term dictionary: one pass over the text finds every
+    term, regardless of dictionary size. Matching is case-folded and whitespace-insensitive,
+    and only whole-word matches count ("gmp" does not hit "gmpx"), so it replaces the
+    per-term `in` scans without their partial-word false positives.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        seen: Dict[str, int] = {}
+        for term in terms:
+            folded, _ = _fold(term.strip())
+            if not folded or folded in seen:
+                continue
+            seen[folded] = len(self.terms)
+            self.terms.append(term)
+            self._insert(folded, seen[folded])
+        self._folded_lengths = {idx: len(f) for f, idx in seen.items()}
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _insert(self, folded: str, term_idx: int):
+        node = 0
+        for ch in folded:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(term_idx)
+
+    def _build_failure_links(self):
+        # BFS from depth 1 (whose failure link is the root) so shallower links exist first
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, text: str) -> List[TermMatch]:
+        """All whole-word occurrences of dictionary terms, in text order."""
+        folded, index_map = _fold(text)
+        matches = []
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for pos, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for term_idx in out[node]:
+                start = pos - self._folded_lengths[term_idx] + 1
+                if start > 0 and folded[start - 1].isalnum() and folded[start].isalnum():
+                    continue
+                if pos + 1 < len(folded) and folded[pos + 1].isalnum() and folded[pos].isalnum():
+                    continue
+                matches.append(TermMatch(self.terms[term_idx], index_map[start], index_map[pos] + 1))
+        matches.sort(key=lambda m: (m.start, -m.end))
+        return matches
+
+    def matched_terms(self, text: str) -> Set[str]:
+        return {m.term for m in self.find_all(text)}
+
+
+@lru_cache(maxsize=64)
+def _cached_matcher(terms: Tuple[str, ...]) -> TermMatcher:
+    return TermMatcher(terms)
+
+
+def get_matcher(terms: Iterable[str]) -> TermMatcher:
+    """Compiled matcher for a term set, built once and reused for repeated sets."""
+    return _cached_matcher(tuple(sorted(set(terms))))